@@ -1,11 +1,69 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
+from django.urls import reverse
+from django.utils.html import format_html
+from django.utils.text import capfirst
+
+from .deletion import get_steps, start_deletion
 from .models import Category, Location, Post, Comment
 
+User = get_user_model()
 
 admin.site.empty_value_display = 'Не задано'
 
 
-class PostAdmin(admin.ModelAdmin):
+class ChunkedDeleteMixin:
+    """Удаляет объекты пачками вместо каскада ORM в одной транзакции."""
+
+    def get_deleted_objects(self, objs, request):
+        deleted_objects = []
+        model_count = {}
+        perms_needed = set()
+        for obj in objs:
+            deleted_objects.append(
+                f'{capfirst(obj._meta.verbose_name)}: {obj}'
+            )
+            for step in get_steps(obj):
+                if not step.total:
+                    continue
+                model_count[step.title] = (
+                    model_count.get(step.title, 0) + step.total
+                )
+                perms_needed.update(
+                    model._meta.verbose_name for model in step.models
+                    if not request.user.has_perm(
+                        f'{model._meta.app_label}.delete_'
+                        f'{model._meta.model_name}'
+                    )
+                )
+        return deleted_objects, model_count, perms_needed, []
+
+    def delete_view(self, request, object_id, extra_context=None):
+        # ModelAdmin.delete_view оборачивает удаление в одну транзакцию, и
+        # пачки стали бы точками сохранения внутри неё.
+        return self._delete_view(request, object_id, extra_context)
+
+    def delete_model(self, request, obj):
+        self.report_deletion(
+            request, start_deletion(obj, owner_id=request.user.id)
+        )
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            self.delete_model(request, obj)
+
+    def report_deletion(self, request, progress):
+        if progress.state == 'done':
+            return
+        messages.info(request, format_html(
+            'Удаление: {} идёт в фоне, <a href="{}">ход выполнения</a>.',
+            progress.label,
+            reverse('blog:deletion_status', args=(progress.job_id,)),
+        ))
+
+
+class PostAdmin(ChunkedDeleteMixin, admin.ModelAdmin):
     list_display = (
         'title',
         'text',
@@ -15,6 +73,7 @@ class PostAdmin(admin.ModelAdmin):
         'category',
         'image',
         'is_published',
+        'comment_count',
     )
     list_editable = ('is_published', 'category', 'pub_date',)
     search_fields = ('title',)
@@ -30,17 +89,23 @@ class CommentAdmin(admin.ModelAdmin):
     list_display_links = ('author', 'post',)
 
 
-class LocationAdmin(admin.ModelAdmin):
+class LocationAdmin(ChunkedDeleteMixin, admin.ModelAdmin):
     list_display = ('name',)
     search_fields = ('name',)
 
 
-class CategoryAdmin(admin.ModelAdmin):
+class CategoryAdmin(ChunkedDeleteMixin, admin.ModelAdmin):
     list_display = ('title', 'description', 'slug')
     search_fields = ('slug',)
     list_editable = ('slug',)
 
 
+class BlogUserAdmin(ChunkedDeleteMixin, UserAdmin):
+    pass
+
+
+admin.site.unregister(User)
+admin.site.register(User, BlogUserAdmin)
 admin.site.register(Category, CategoryAdmin)
 admin.site.register(Location, LocationAdmin)
 admin.site.register(Post, PostAdmin)
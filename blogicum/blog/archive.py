@@ -0,0 +1,88 @@
+from contextlib import ExitStack
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+
+from .models import ArchivedComment, ArchivedPost, Post
+from .sharding import comments_for_posts
+from .signals import posts_archived
+
+POST_FIELDS = (
+    'id', 'is_published', 'created_at', 'title', 'text', 'pub_date',
+    'author_id', 'location_id', 'category_id', 'image', 'comment_count',
+)
+COMMENT_FIELDS = (
+    'id', 'is_published', 'created_at', 'author_id', 'post_id', 'text',
+)
+
+
+def archive_cutoff():
+    return timezone.now() - timedelta(days=settings.POST_ARCHIVE_AFTER_DAYS)
+
+
+def archive_posts(batch_size=None):
+    """Переносит публикации старше archive_cutoff() в архив пачками.
+
+    Возвращает генератор, который после каждой пачки отдаёт число уже
+    перенесённых публикаций.
+    """
+    cutoff = archive_cutoff()
+    batch_size = batch_size or settings.POST_ARCHIVE_BATCH_SIZE
+    archived = 0
+    while True:
+        post_ids = list(
+            Post.objects.filter(pub_date__lt=cutoff)
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not post_ids:
+            return
+        archive_batch(post_ids, batch_size)
+        archived += len(post_ids)
+        yield archived
+
+
+def archive_batch(post_ids, batch_size):
+    posts = list(Post.objects.filter(id__in=post_ids).values(
+        *POST_FIELDS, 'author__username'
+    ))
+    comment_sets = comments_for_posts(post_ids)
+    with ExitStack() as stack:
+        # Базы комментариев фиксируются после основной: если сбой случится
+        # между фиксациями, в шарде останутся уже скопированные в архив
+        # комментарии, но ничего не потеряется.
+        for comments in comment_sets:
+            stack.enter_context(transaction.atomic(using=comments.db))
+        with transaction.atomic():
+            ArchivedPost.objects.bulk_create(
+                ArchivedPost(**{field: post[field] for field in POST_FIELDS})
+                for post in posts
+            )
+            copied = [
+                copy_comments(comments, batch_size)
+                for comments in comment_sets
+            ]
+            Post.objects.filter(id__in=post_ids)._raw_delete(DEFAULT_DB_ALIAS)
+        # Удаление без сигналов: счётчики и кеш обновляются ниже целиком.
+        for comments, ids in zip(comment_sets, copied):
+            for start in range(0, len(ids), batch_size):
+                comments.filter(
+                    id__in=ids[start:start + batch_size]
+                )._raw_delete(comments.db)
+    posts_archived.send(sender=Post, posts=posts)
+
+
+def copy_comments(comments, batch_size):
+    copied = []
+    chunk = []
+    for comment in comments.values(*COMMENT_FIELDS).iterator(
+        chunk_size=batch_size
+    ):
+        chunk.append(ArchivedComment(**comment))
+        if len(chunk) == batch_size:
+            ArchivedComment.objects.bulk_create(chunk)
+            copied += [archived.id for archived in chunk]
+            chunk = []
+    ArchivedComment.objects.bulk_create(chunk)
+    return copied + [archived.id for archived in chunk]
@@ -0,0 +1,87 @@
+import threading
+import time
+
+
+class PoolExhausted(Exception):
+    """Все соединения пула заняты дольше допустимого ожидания."""
+
+
+class ConnectionPool:
+    """Ограниченный пул постоянных соединений с базой данных.
+
+    Соединение старше max_lifetime закрывается вместо возврата в пул,
+    а простоявшее дольше check_after перед выдачей проверяется ping().
+    """
+
+    def __init__(self, connect, ping, reset, close, max_size=10,
+                 max_lifetime=30 * 60, timeout=5, check_after=30):
+        self.connect = connect
+        self.ping = ping
+        self.reset = reset
+        self.close = close
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.check_after = check_after
+        self.slots = threading.BoundedSemaphore(max_size)
+        self.lock = threading.Lock()
+        self.idle = []
+        self.created = {}
+
+    def get(self):
+        if not self.slots.acquire(timeout=self.timeout):
+            raise PoolExhausted('Нет свободных соединений с базой данных.')
+        try:
+            return self.take()
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def take(self):
+        while True:
+            with self.lock:
+                item = self.idle.pop() if self.idle else None
+            if item is None:
+                connection = self.connect()
+                self.created[id(connection)] = time.monotonic()
+                return connection
+            connection, last_used = item
+            now = time.monotonic()
+            if self.is_expired(connection, now) or (
+                now - last_used > self.check_after
+                and not self.ping(connection)
+            ):
+                self.discard(connection)
+                continue
+            return connection
+
+    def put(self, connection):
+        try:
+            if self.is_expired(connection, time.monotonic()) or not (
+                self.reset(connection)
+            ):
+                self.discard(connection)
+                return
+            with self.lock:
+                self.idle.append((connection, time.monotonic()))
+        finally:
+            self.slots.release()
+
+    def is_expired(self, connection, now):
+        return now - self.created[id(connection)] > self.max_lifetime
+
+    def discard(self, connection):
+        self.created.pop(id(connection), None)
+        try:
+            self.close(connection)
+        except Exception:
+            pass
+
+    def close_idle(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for connection, _ in idle:
+            self.discard(connection)
+
+    def stats(self):
+        with self.lock:
+            return {'open': len(self.created), 'idle': len(self.idle)}
@@ -0,0 +1,112 @@
+import threading
+
+import psycopg2.extras
+from django.db.backends.postgresql import base, creation
+from psycopg2 import extensions
+
+from ..pool import ConnectionPool
+
+Database = base.Database
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+POOL_DEFAULTS = {
+    'max_size': 10,
+    'max_lifetime': 30 * 60,
+    'timeout': 5,
+    'check_after': 30,
+}
+
+
+def connect(conn_params):
+    connection = Database.connect(**conn_params)
+    psycopg2.extras.register_default_jsonb(
+        conn_or_curs=connection, loads=lambda x: x
+    )
+    return connection
+
+
+def ping(connection):
+    if connection.closed:
+        return False
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        if not connection.autocommit:
+            connection.rollback()
+    except Database.Error:
+        return False
+    return True
+
+
+def reset(connection):
+    if connection.closed:
+        return False
+    status = connection.get_transaction_status()
+    if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+        return False
+    try:
+        if status != extensions.TRANSACTION_STATUS_IDLE:
+            connection.rollback()
+    except Database.Error:
+        return False
+    return True
+
+
+def close_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_idle()
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Простаивающие соединения пула не дадут удалить базу.
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+    pool = None
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        conn_params.pop('pool', None)
+        return conn_params
+
+    def get_pool(self, conn_params):
+        key = (self.alias, tuple(sorted(conn_params.items())))
+        with _pools_lock:
+            if key not in _pools:
+                _pools[key] = ConnectionPool(
+                    connect=lambda: connect(conn_params),
+                    ping=ping,
+                    reset=reset,
+                    close=lambda connection: connection.close(),
+                    **{
+                        **POOL_DEFAULTS,
+                        **self.settings_dict['OPTIONS'].get('pool', {}),
+                    },
+                )
+            return _pools[key]
+
+    def get_new_connection(self, conn_params):
+        self.pool = self.get_pool(conn_params)
+        connection = self.pool.get()
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.put(self.connection)
@@ -0,0 +1,166 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .counters import change_comment_count
+from .models import Comment, Post
+from .sharding import is_sharded, next_comment_id, shard_for
+from .signals import comments_flushed
+from .writer import run_write
+
+logger = logging.getLogger(__name__)
+
+
+class CommentBuffer:
+    """Копит новые комментарии в памяти процесса и пишет их пачками."""
+
+    def __init__(self, batch_size=None, flush_interval=None):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.worker = None
+        self.flushed_total = 0
+        self.dropped_total = 0
+        self.flush_count = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+
+    def get_batch_size(self):
+        return self.batch_size or settings.COMMENT_BUFFER_BATCH_SIZE
+
+    def get_flush_interval(self):
+        return self.flush_interval or settings.COMMENT_BUFFER_FLUSH_INTERVAL
+
+    def add(self, comment):
+        self.queue.put(comment)
+        self.ensure_worker()
+
+    def ensure_worker(self):
+        with self.lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(
+                    target=self.run, name='comment-buffer', daemon=True
+                )
+                self.worker.start()
+
+    def run(self):
+        while True:
+            time.sleep(self.get_flush_interval())
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Не удалось записать пачку комментариев.')
+            finally:
+                close_old_connections()
+
+    def take_batch(self):
+        batch = []
+        while len(batch) < self.get_batch_size():
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self):
+        flushed = 0
+        while True:
+            batch = self.take_batch()
+            if not batch:
+                return flushed
+            started = time.perf_counter()
+            try:
+                self.write_with_retries(batch)
+            except Exception:
+                self.dropped_total += len(batch)
+                logger.exception(
+                    'Пачка из %d комментариев не записана и потеряна.',
+                    len(batch),
+                )
+                continue
+            latency = time.perf_counter() - started
+            flushed += len(batch)
+            self.flushed_total += len(batch)
+            self.flush_count += 1
+            self.last_flush_latency = latency
+            self.max_flush_latency = max(self.max_flush_latency, latency)
+            logger.debug(
+                'Записано комментариев: %d за %.1f мс, в очереди: %d',
+                len(batch), latency * 1000, self.queue.qsize(),
+            )
+
+    def write_with_retries(self, batch):
+        # Комментарии уже приняты, поэтому временную ошибку вроде
+        # «database is locked» переживаем повторами с паузой.
+        retries = settings.COMMENT_BUFFER_RETRIES
+        for attempt in range(retries + 1):
+            try:
+                return self.write_batch(batch)
+            except Exception:
+                if attempt == retries:
+                    raise
+                logger.warning(
+                    'Не удалось записать пачку комментариев, попытка %d.',
+                    attempt + 1, exc_info=True,
+                )
+                time.sleep(self.get_flush_interval() * 2 ** attempt)
+
+    def write_batch(self, batch):
+        counts, categories = run_write(self.store_batch, batch)
+        comments_flushed.send(
+            sender=Comment,
+            post_ids=list(counts),
+            category_ids=list({categories[pk] for pk in counts}),
+        )
+
+    def store_batch(self, batch):
+        # Публикацию могли удалить, пока комментарий ждал в очереди.
+        categories = dict(Post.objects.filter(
+            id__in={comment.post_id for comment in batch}
+        ).values_list('id', 'category_id'))
+        batch = [
+            comment for comment in batch if comment.post_id in categories
+        ]
+        self.save_comments(batch)
+        counts = Counter(comment.post_id for comment in batch)
+        for post_id, delta in counts.items():
+            change_comment_count(post_id, delta)
+        return counts, categories
+
+    def save_comments(self, batch):
+        if not is_sharded():
+            Comment.objects.bulk_create(batch)
+            return
+        shards = defaultdict(list)
+        for comment in batch:
+            # Идентификатор выдаётся один раз: при повторе пачки шарды,
+            # которые уже зафиксировали запись, пропустят её комментарии.
+            if comment.pk is None:
+                comment.pk = next_comment_id()
+            shards[shard_for(comment.post_id)].append(comment)
+        for alias, comments in shards.items():
+            with transaction.atomic(using=alias):
+                Comment.objects.using(alias).bulk_create(
+                    comments, ignore_conflicts=True
+                )
+
+    def metrics(self):
+        return {
+            'queue_depth': self.queue.qsize(),
+            'flushed_total': self.flushed_total,
+            'dropped_total': self.dropped_total,
+            'flush_count': self.flush_count,
+            'last_flush_latency_ms': self.last_flush_latency * 1000,
+            'max_flush_latency_ms': self.max_flush_latency * 1000,
+        }
+
+
+comment_buffer = CommentBuffer()
+atexit.register(comment_buffer.flush)
@@ -0,0 +1,73 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+PAGE_KEY = 'page:{}:{}'
+TAG_KEY = 'tag:{}'
+NEXT_RELEASE_KEY = 'scheduler:next_release'
+CACHE_HEADER = 'X-Cache'
+
+
+def get_tag_versions(tags):
+    keys = [TAG_KEY.format(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Начальная версия уникальна, поэтому вытеснение ключа тега из
+            # кеша не вернёт к жизни страницы, сохранённые до этого.
+            initial = time.time_ns()
+            cache.add(key, initial, None)
+            # Без кеша (DummyCache) ключ не сохраняется.
+            versions[key] = cache.get(key) or initial
+    return [versions[key] for key in keys]
+
+
+def tags_changed_within(tags, seconds):
+    # Неизвестный кешу тег получает версию «сейчас» и тоже считается
+    # изменённым: когда он менялся на самом деле, неизвестно.
+    since = time.time_ns() - seconds * 10 ** 9
+    return max(get_tag_versions(tags), default=0) > since
+
+
+def bump_tags(*tags):
+    # Версия тега — время последнего изменения в наносекундах, поэтому из
+    # версий же получается заголовок Last-Modified. Гонка двух сбросов
+    # безопасна: оба записывают значение, отличное от прежней версии.
+    keys = [TAG_KEY.format(tag) for tag in set(tags)]
+    old = cache.get_many(keys)
+    now = time.time_ns()
+    cache.set_many(
+        {key: max(now, old.get(key, 0) + 1) for key in keys}, None
+    )
+
+
+def page_cache_key(request, tags):
+    versions = '.'.join(str(version) for version in get_tag_versions(tags))
+    url = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return PAGE_KEY.format(url, versions)
+
+
+def is_page_cacheable(request):
+    return (
+        settings.PAGE_CACHE_ENABLED
+        and request.method in ('GET', 'HEAD')
+        and not request.user.is_authenticated
+    )
+
+
+def store_page(key, response):
+    if response.status_code == 200 and not response.cookies:
+        cache.set(key, response, settings.PAGE_CACHE_TIMEOUT)
+
+
+def attach_card_versions(posts):
+    posts = list(posts)
+    versions = get_tag_versions(
+        [f'post:{post.id}' for post in posts] + ['taxonomy']
+    )
+    taxonomy = versions.pop()
+    for post, version in zip(posts, versions):
+        post.card_version = f'{version}.{taxonomy}'
+    return posts
@@ -0,0 +1,42 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Post
+from .sharding import comment_querysets, is_sharded
+
+
+def change_comment_count(post_id, delta):
+    posts = Post.objects.filter(pk=post_id)
+    if delta < 0:
+        posts = posts.filter(comment_count__gte=-delta)
+    return posts.update(
+        comment_count=F('comment_count') + delta
+    )
+
+
+def recount_comment_counts(posts=None):
+    if posts is None:
+        posts = Post.objects.all()
+    if is_sharded():
+        return recount_sharded_comment_counts(posts)
+    counts = Comment.objects.filter(
+        post=OuterRef('pk')
+    ).order_by().values('post').annotate(total=Count('id')).values('total')
+    return posts.update(comment_count=Coalesce(Subquery(counts), 0))
+
+
+def recount_sharded_comment_counts(posts):
+    # Подзапрос к другой базе невозможен: считаем по шардам в памяти.
+    totals = {}
+    for comments in comment_querysets():
+        totals.update(comments.order_by().values('post').annotate(
+            total=Count('id')
+        ).values_list('post', 'total'))
+    updated = []
+    for post in posts.only('id', 'comment_count').iterator():
+        total = totals.get(post.id, 0)
+        if post.comment_count != total:
+            post.comment_count = total
+            updated.append(post)
+    Post.objects.bulk_update(updated, ['comment_count'], batch_size=500)
+    return posts.count()
@@ -0,0 +1,331 @@
+import logging
+import threading
+import uuid
+from collections import Counter, namedtuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F, Sum
+
+from .cache import bump_tags
+from .counters import change_comment_count
+from .models import (ArchivedComment, ArchivedPost, Category, Comment,
+                     Location, Post)
+from .sharding import comment_querysets, comments_for_posts
+from .signals import invalidate_feed_counts, invalidate_post_pages
+from .writer import run_write
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+PROGRESS_KEY = 'deletion:{}'
+
+# Шаг удаления: сколько строк он затронет, как его выполнить и права на
+# удаление каких моделей нужны для него в админке.
+Step = namedtuple('Step', ('title', 'total', 'run', 'models'))
+
+
+class DeletionProgress:
+    """Ход удаления; хранится в кеше, чтобы его видели другие запросы."""
+
+    def __init__(self, obj, owner_id=None, callback=None):
+        self.job_id = uuid.uuid4().hex
+        self.label = f'{obj._meta.verbose_name} «{obj}»'
+        self.owner_id = owner_id
+        self.callback = callback
+        self.thread = None
+        self.state = 'pending'
+        self.step = ''
+        self.done = 0
+        self.total = 0
+        self.error = ''
+
+    def as_dict(self):
+        return {
+            'job': self.job_id,
+            'object': self.label,
+            'owner': self.owner_id,
+            'state': self.state,
+            'step': self.step,
+            'done': self.done,
+            'total': self.total,
+            'error': self.error,
+        }
+
+    def save(self):
+        cache.set(
+            PROGRESS_KEY.format(self.job_id), self.as_dict(),
+            settings.DELETION_PROGRESS_TIMEOUT,
+        )
+        if self.callback is not None:
+            self.callback(self)
+
+    def start_step(self, title):
+        self.step = title
+        self.save()
+
+    def advance(self, count):
+        self.done += count
+        self.save()
+
+
+def get_progress(job_id):
+    return cache.get(PROGRESS_KEY.format(job_id))
+
+
+def delete_in_batches(queryset, progress, fields=(), on_batch=None):
+    """Удаляет строки выборки пачками, каждую в своей транзакции.
+
+    Сигналы и каскад ORM не срабатывают: зависимые строки к этому моменту
+    уже удалены, а счётчики и кеш обновляет on_batch.
+    """
+    db = queryset.db
+
+    def delete_batch():
+        with transaction.atomic(using=db):
+            rows = list(queryset.order_by('pk').values_list(
+                'pk', *fields
+            )[:settings.DELETION_BATCH_SIZE])
+            queryset.model.objects.filter(
+                pk__in=[row[0] for row in rows]
+            )._raw_delete(db)
+            if rows and on_batch is not None:
+                on_batch(rows)
+            return len(rows)
+
+    while True:
+        deleted = run_write(delete_batch)
+        if not deleted:
+            return
+        progress.advance(deleted)
+
+
+def delete_each(querysets, progress, **kwargs):
+    for queryset in querysets:
+        delete_in_batches(queryset, progress, **kwargs)
+
+
+def set_null_in_batches(queryset, progress, **values):
+    def update_batch():
+        rows = list(queryset.order_by('pk').values_list(
+            'pk', 'author_id'
+        )[:settings.DELETION_BATCH_SIZE])
+        queryset.model.objects.filter(
+            pk__in=[pk for pk, _ in rows]
+        ).update(**values)
+        invalidate_feed_counts(author_ids={author for _, author in rows})
+        return len(rows)
+
+    while True:
+        updated = run_write(update_batch)
+        if not updated:
+            return
+        progress.advance(updated)
+
+
+def forget_comments(rows):
+    counts = Counter(post_id for _, post_id in rows)
+    for post_id, count in counts.items():
+        change_comment_count(post_id, -count)
+    invalidate_post_pages(post_ids=counts)
+    bump_tags(*(f'comments:{post_id}' for post_id in counts))
+
+
+def forget_archived_comments(rows):
+    counts = Counter(post_id for _, post_id in rows)
+    for post_id, count in counts.items():
+        ArchivedPost.objects.filter(pk=post_id).update(
+            comment_count=F('comment_count') - count
+        )
+    bump_tags(*(f'comments:{post_id}' for post_id in counts))
+
+
+def forget_posts(rows):
+    category_ids = {category_id for _, _, category_id in rows}
+    invalidate_feed_counts(
+        category_ids=category_ids,
+        author_ids={author_id for _, author_id, _ in rows},
+    )
+    invalidate_post_pages(
+        post_ids=[pk for pk, _, _ in rows], category_ids=category_ids
+    )
+
+
+def delete_posts(posts, progress, comments_for=comments_for_posts,
+                 on_batch=forget_posts):
+    # Комментарии удаляются по пачкам публикаций: выборка по post_id идёт
+    # по индексу и не держит в памяти все комментарии автора.
+    while True:
+        post_ids = list(posts.order_by('pk').values_list(
+            'pk', flat=True
+        )[:settings.DELETION_BATCH_SIZE])
+        if not post_ids:
+            return
+        delete_each(comments_for(post_ids), progress)
+        delete_in_batches(
+            posts.filter(pk__in=post_ids), progress,
+            fields=('author_id', 'category_id'), on_batch=on_batch,
+        )
+
+
+def archived_comments_for(post_ids):
+    return [ArchivedComment.objects.filter(post_id__in=post_ids)]
+
+
+def count_with_comments(posts):
+    totals = posts.aggregate(posts=Count('pk'), comments=Sum('comment_count'))
+    return totals['posts'] + (totals['comments'] or 0)
+
+
+def post_steps(post):
+    return [Step(
+        'Комментарии публикации', post.comment_count,
+        lambda progress: delete_each(comments_for_posts([post.pk]), progress),
+        (Comment,),
+    )]
+
+
+def user_steps(user):
+    comments = [qs.filter(author=user) for qs in comment_querysets()]
+    archived_comments = ArchivedComment.objects.filter(author=user)
+    posts = Post.objects.filter(author=user)
+    archived_posts = ArchivedPost.objects.filter(author=user)
+    return [
+        Step(
+            'Комментарии пользователя',
+            sum(qs.count() for qs in comments),
+            lambda progress: delete_each(
+                comments, progress, fields=('post_id',),
+                on_batch=forget_comments,
+            ),
+            (Comment,),
+        ),
+        Step(
+            'Архивные комментарии пользователя', archived_comments.count(),
+            lambda progress: delete_in_batches(
+                archived_comments, progress, fields=('post_id',),
+                on_batch=forget_archived_comments,
+            ),
+            (ArchivedComment,),
+        ),
+        Step(
+            'Публикации пользователя', count_with_comments(posts),
+            lambda progress: delete_posts(posts, progress),
+            (Post, Comment),
+        ),
+        Step(
+            'Архивные публикации пользователя',
+            count_with_comments(archived_posts),
+            lambda progress: delete_posts(
+                archived_posts, progress,
+                comments_for=archived_comments_for, on_batch=None,
+            ),
+            (ArchivedPost, ArchivedComment),
+        ),
+    ]
+
+
+def detach_steps(field):
+    def steps(obj):
+        posts = Post.objects.filter(**{field: obj})
+        archived_posts = ArchivedPost.objects.filter(**{field: obj})
+        values = {field: None}
+        if field == 'category':
+            values['is_visible'] = False
+        return [
+            Step(
+                'Публикации', posts.count(),
+                lambda progress: set_null_in_batches(
+                    posts, progress, **values
+                ),
+                (),
+            ),
+            Step(
+                'Архивные публикации', archived_posts.count(),
+                lambda progress: set_null_in_batches(
+                    archived_posts, progress, **{field: None}
+                ),
+                (),
+            ),
+        ]
+    return steps
+
+
+PLANS = {
+    Post: post_steps,
+    User: user_steps,
+    Category: detach_steps('category'),
+    Location: detach_steps('location'),
+}
+
+
+def get_steps(obj):
+    return PLANS[type(obj)](obj)
+
+
+def delete_object(obj, progress=None):
+    """Удаляет объект, обрабатывая зависимые строки пачками."""
+    progress = progress or DeletionProgress(obj)
+    steps = get_steps(obj)
+    progress.total = sum(step.total for step in steps) + 1
+    progress.state = 'running'
+    try:
+        for step in steps:
+            progress.start_step(step.title)
+            step.run(progress)
+        progress.start_step(str(obj._meta.verbose_name).capitalize())
+        # Зависимых строк уже нет, и каскад ORM ничего не загрузит; сигналы
+        # самого объекта срабатывают как при обычном удалении.
+        run_write(obj.delete)
+        if isinstance(obj, User):
+            bump_tags(f'profile:{obj.username}')
+    except Exception as error:
+        progress.state = 'failed'
+        progress.error = str(error)
+        progress.save()
+        raise
+    # Итог считается заранее и может включать одни строки дважды.
+    progress.state = 'done'
+    progress.done = progress.total
+    progress.save()
+    return progress
+
+
+def hide(obj):
+    if isinstance(obj, Post):
+        obj.is_published = False
+        run_write(obj.save, update_fields=['is_published'])
+    elif isinstance(obj, User):
+        obj.is_active = False
+        run_write(obj.save, update_fields=['is_active'])
+
+
+def run_in_background(obj, progress):
+    try:
+        delete_object(obj, progress)
+    except Exception:
+        logger.exception('Не удалось удалить %s.', progress.label)
+    finally:
+        close_old_connections()
+
+
+def start_deletion(obj, owner_id=None, background=None):
+    """Удаляет объект сразу или, если включено, в фоновом потоке.
+
+    Перед фоновым удалением публикация снимается с публикации, а
+    пользователь блокируется, чтобы они пропали со страниц сразу.
+    """
+    if background is None:
+        background = settings.DELETION_BACKGROUND
+    progress = DeletionProgress(obj, owner_id=owner_id)
+    if not background:
+        return delete_object(obj, progress)
+    progress.save()
+    hide(obj)
+    progress.thread = threading.Thread(
+        target=run_in_background, args=(obj, progress),
+        name=f'deletion-{progress.job_id}', daemon=True,
+    )
+    progress.thread.start()
+    return progress
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from blog.archive import archive_posts
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит старые публикации и их комментарии в архивные таблицы, '
+        'чтобы рабочие таблицы и их индексы оставались небольшими.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        archived = 0
+        for archived in archive_posts(batch_size=options['batch_size']):
+            self.stdout.write(f'Перенесено публикаций: {archived}')
+        self.stdout.write(
+            self.style.SUCCESS(f'Архивировано публикаций: {archived}')
+        )
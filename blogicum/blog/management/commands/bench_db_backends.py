@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+BACKENDS = (
+    ('SQLite, профиль production',
+     {'DB_ENGINE': 'sqlite3', 'DB_PROFILE': 'production'}),
+    ('PostgreSQL с пулом соединений', {'DB_ENGINE': 'postgresql'}),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает bench_views на SQLite и на PostgreSQL (параметры '
+        'подключения берутся из переменных окружения POSTGRES_*, DB_HOST, '
+        'DB_PORT и DB_POOL_*) и выводит результаты рядом.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--duration', type=float, default=5)
+
+    def handle(self, *args, **options):
+        arguments = [
+            f'--{name}={options[name]}'
+            for name in ('readers', 'writers', 'duration')
+        ]
+        for title, environment in BACKENDS:
+            self.stdout.write(self.style.MIGRATE_HEADING(title))
+            result = subprocess.run(
+                [
+                    sys.executable, str(settings.BASE_DIR / 'manage.py'),
+                    'bench_views', *arguments,
+                ],
+                env={**os.environ, **environment},
+                capture_output=True,
+                text=True,
+            )
+            if result.returncode:
+                raise CommandError(result.stderr)
+            self.stdout.write(result.stdout)
@@ -0,0 +1,174 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+from django.utils import timezone
+
+from blog.models import Category, Comment, Location, Post
+from blog.paginators import KeysetPaginator
+from blog.views import PAGINATION, CategoryView, Index, Profile
+
+User = get_user_model()
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает планы и время запросов ленты, категории, профиля и '
+        'комментариев без индексов и с индексами на временной базе данных.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--comments', type=int, default=200_000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            self.seed(options['posts'], options['comments'])
+            with connection.schema_editor() as editor:
+                for model in (Post, Comment):
+                    for index in model._meta.indexes:
+                        editor.remove_index(model, index)
+            self.analyze()
+            self.report('Без индексов', options['repeat'])
+            with connection.schema_editor() as editor:
+                for model in (Post, Comment):
+                    for index in model._meta.indexes:
+                        editor.add_index(model, index)
+            self.analyze()
+            self.report('С индексами', options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def seed(self, n_posts, n_comments):
+        self.stdout.write(f'Заполнение: {n_posts} публикаций...')
+        User.objects.bulk_create(
+            User(username=f'bench_{i}') for i in range(100)
+        )
+        Category.objects.bulk_create(
+            Category(
+                title=f'Категория {i}', description='', slug=f'bench-{i}',
+                is_published=i % 10 != 0
+            )
+            for i in range(20)
+        )
+        Location.objects.bulk_create(
+            Location(name=f'Место {i}') for i in range(50)
+        )
+        authors = list(User.objects.filter(username__startswith='bench_'))
+        categories = list(Category.objects.all())
+        locations = list(Location.objects.all())
+        now = timezone.now()
+        for start in range(0, n_posts, BATCH_SIZE):
+            posts = []
+            for i in range(start, min(start + BATCH_SIZE, n_posts)):
+                post = Post(
+                    title=f'Публикация {i}',
+                    text='Текст публикации',
+                    pub_date=now - timedelta(minutes=i - n_posts // 100),
+                    author=random.choice(authors),
+                    category=random.choice(categories),
+                    location=random.choice(locations),
+                    is_published=i % 20 != 0,
+                )
+                post.is_visible = (
+                    post.is_published and post.pub_date <= now
+                    and post.category.is_published
+                )
+                posts.append(post)
+            Post.objects.bulk_create(posts)
+        post_ids = list(
+            Post.objects.order_by('-pub_date').values_list('id', flat=True)[
+                :max(n_comments // 100, 1)
+            ]
+        )
+        for start in range(0, n_comments, BATCH_SIZE):
+            Comment.objects.bulk_create(
+                Comment(
+                    text='Комментарий',
+                    post_id=random.choice(post_ids),
+                    author=random.choice(authors),
+                )
+                for _ in range(start, min(start + BATCH_SIZE, n_comments))
+            )
+
+    def get_cases(self):
+        factory = RequestFactory()
+        category = Category.objects.filter(is_published=True).first()
+        author = User.objects.filter(username__startswith='bench_').first()
+        post_id = Comment.objects.values_list('post_id', flat=True).first()
+        cases = []
+        for title, view_class, kwargs in (
+            ('Index', Index, {}),
+            ('CategoryView', CategoryView,
+             {'category_slug': category.slug}),
+            ('Profile', Profile, {'username': author.username}),
+        ):
+            request = factory.get('/')
+            request.user = AnonymousUser()
+            view = view_class()
+            view.setup(request, **kwargs)
+            queryset = view.get_queryset()
+            paginator = KeysetPaginator(
+                queryset, PAGINATION, ordering=view.keyset_ordering
+            )
+            cases.append((title, paginator))
+        comments = Comment.objects.filter(post=post_id).order_by('created_at')
+        return cases, comments
+
+    def timed(self, func, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - started) / repeat * 1000
+
+    def report(self, title, repeat):
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+        cases, comments = self.get_cases()
+        for name, paginator in cases:
+            first_page = paginator.object_list.order_by(*paginator.ordering)
+            self.stdout.write(f'{name}:')
+            self.stdout.write(first_page[:PAGINATION + 1].explain())
+            deep = list(first_page[PAGINATION * 1000:PAGINATION * 1000 + 1])
+            self.stdout.write(
+                '  первая страница: %.2f мс' % self.timed(
+                    lambda: list(paginator.page()), repeat
+                )
+            )
+            if deep:
+                deep_cursor = paginator.encode_cursor(deep[0])
+                self.stdout.write(
+                    '  страница 1000 по курсору: %.2f мс' % self.timed(
+                        lambda: list(paginator.page(after=deep_cursor)),
+                        repeat,
+                    )
+                )
+            self.stdout.write(
+                '  страница 1000 через OFFSET: %.2f мс' % self.timed(
+                    lambda: list(
+                        first_page[PAGINATION * 1000:PAGINATION * 1001]
+                    ),
+                    repeat,
+                )
+            )
+        self.stdout.write('PostDetail (комментарии):')
+        self.stdout.write(comments.explain())
+        self.stdout.write(
+            '  комментарии публикации: %.2f мс' % self.timed(
+                lambda: list(comments), repeat
+            )
+        )
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from .bench_views import Command as ViewsBenchCommand
+
+
+class Command(ViewsBenchCommand):
+    help = (
+        'Нагружает ленту, страницу публикации и добавление комментариев '
+        'параллельными запросами с настройками SQLite по умолчанию и с '
+        'профилем production.'
+    )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Бенчмарк рассчитан на SQLite.')
+        with self.test_database():
+            self.seed()
+            for title, pragmas, conn_max_age in (
+                ('По умолчанию', {'journal_mode': 'DELETE'}, 0),
+                ('Production', settings.SQLITE_PRODUCTION_PRAGMAS,
+                 settings.SQLITE_PRODUCTION_CONN_MAX_AGE),
+            ):
+                connection.close()
+                with override_settings(DEBUG=False, SQLITE_PRAGMAS=pragmas):
+                    self.report(title, conn_max_age, options)
@@ -0,0 +1,30 @@
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from .bench_views import Command as ViewsBenchCommand
+
+
+class Command(ViewsBenchCommand):
+    help = (
+        'Сравнивает пропускную способность SQLite при смешанной нагрузке '
+        'чтения и записи: прямая запись из потоков и запись через '
+        'поток-писатель.'
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.set_defaults(writers=8)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Бенчмарк рассчитан на SQLite.')
+        with self.test_database():
+            self.seed()
+            for title, serialized in (
+                ('Прямая запись', False), ('Поток-писатель', True)
+            ):
+                with override_settings(
+                    DEBUG=False, DB_WRITE_SERIALIZED=serialized
+                ):
+                    self.report(title, None, options)
@@ -0,0 +1,144 @@
+import os
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from blog.models import Category, Post
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает ленту, страницу публикации и добавление комментариев '
+        'параллельными запросами на временной базе данных из настроек.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--duration', type=float, default=5)
+
+    def handle(self, *args, **options):
+        with self.test_database():
+            self.seed()
+            with override_settings(DEBUG=False):
+                self.report(connection.display_name, None, options)
+
+    @contextmanager
+    def test_database(self):
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        with tempfile.TemporaryDirectory() as directory:
+            if connection.vendor == 'sqlite':
+                # Файловая база вместо базы в памяти, чтобы блокировки
+                # были такими же, как в рабочем окружении.
+                connection.settings_dict['TEST']['NAME'] = os.path.join(
+                    directory, 'bench.sqlite3'
+                )
+            connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, serialize=False
+            )
+            try:
+                yield
+            finally:
+                connection.close()
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def seed(self):
+        self.author = User.objects.create(username='bench_author')
+        category = Category.objects.create(
+            title='Категория', description='', slug='bench'
+        )
+        Post.objects.bulk_create(
+            Post(
+                title=f'Публикация {i}', text='Текст',
+                pub_date=timezone.now(), author=self.author,
+                category=category, is_visible=True,
+            )
+            for i in range(1000)
+        )
+        self.post_ids = list(
+            Post.objects.order_by('-pub_date').values_list('id', flat=True)
+        )
+
+    def reader(self, client, number):
+        if number % 2:
+            return client.get(reverse('blog:index'))
+        post_id = self.post_ids[number % 20]
+        return client.get(reverse('blog:post_detail', args=(post_id,)))
+
+    def writer(self, client, number):
+        post_id = self.post_ids[number % 20]
+        return client.post(
+            reverse('blog:add_comment', args=(post_id,)),
+            data={'text': f'Комментарий {number}'},
+        )
+
+    def worker(self, operation, conn_max_age, deadline, stats):
+        if conn_max_age is not None:
+            connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+        client = Client()
+        client.force_login(self.author)
+        number = 0
+        try:
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = operation(client, number)
+                except Exception:
+                    stats['errors'] += 1
+                else:
+                    if response.status_code >= 500:
+                        stats['errors'] += 1
+                    else:
+                        stats['latencies'].append(
+                            time.perf_counter() - started
+                        )
+                number += 1
+        finally:
+            connection.close()
+
+    def report(self, title, conn_max_age, options):
+        deadline = time.monotonic() + options['duration']
+        reads = {'errors': 0, 'latencies': []}
+        writes = {'errors': 0, 'latencies': []}
+        threads = [
+            threading.Thread(
+                target=self.worker,
+                args=(self.reader, conn_max_age, deadline, reads),
+            )
+            for _ in range(options['readers'])
+        ] + [
+            threading.Thread(
+                target=self.worker,
+                args=(self.writer, conn_max_age, deadline, writes),
+            )
+            for _ in range(options['writers'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+        for name, stats in (('чтение', reads), ('запись', writes)):
+            latencies = sorted(stats['latencies']) or [0]
+            self.stdout.write(
+                '  %s: %.0f запр/с, p50 %.1f мс, p95 %.1f мс, ошибок %d' % (
+                    name,
+                    len(stats['latencies']) / options['duration'],
+                    statistics.median(latencies) * 1000,
+                    latencies[int(len(latencies) * 0.95)] * 1000,
+                    stats['errors'],
+                )
+            )
@@ -0,0 +1,40 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.deletion import PLANS, DeletionProgress, delete_object
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет публикацию, пользователя, категорию или местоположение '
+        'вместе с зависимыми строками пачками и показывает ход удаления.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', help='Например, blog.Post или auth.User.')
+        parser.add_argument('pk')
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model(options['model'])
+        except (LookupError, ValueError):
+            raise CommandError(f'Неизвестная модель: {options["model"]}')
+        if model not in PLANS:
+            raise CommandError(
+                f'Пакетное удаление не поддерживается: {options["model"]}'
+            )
+        try:
+            obj = model.objects.get(pk=options['pk'])
+        except (model.DoesNotExist, ValueError):
+            raise CommandError('Объект не найден.')
+        progress = delete_object(obj, DeletionProgress(
+            obj, callback=self.report
+        ))
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено: {progress.label}, затронуто строк: {progress.done}'
+        ))
+
+    def report(self, progress):
+        self.stdout.write(
+            f'{progress.step}: {progress.done} из {progress.total}'
+        )
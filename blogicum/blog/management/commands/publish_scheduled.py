@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from blog.scheduling import get_next_release_date, release_due_posts
+
+
+class Command(BaseCommand):
+    help = (
+        'Открывает отложенные публикации, время которых наступило. '
+        'С флагом --watch работает постоянно и просыпается к дате '
+        'следующей отложенной публикации.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--watch', action='store_true')
+        parser.add_argument(
+            '--interval', type=float, default=60,
+            help='Максимальная пауза между проверками, в секундах.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            released = release_due_posts()
+            if released:
+                self.stdout.write(
+                    self.style.SUCCESS(f'Опубликовано: {released}')
+                )
+            if not options['watch']:
+                return
+            next_date = get_next_release_date()
+            pause = options['interval']
+            if next_date:
+                pause = min(
+                    pause, (next_date - timezone.now()).total_seconds()
+                )
+            time.sleep(max(pause, 0))
@@ -0,0 +1,84 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from blog.models import Comment
+from blog.sharding import shard_for
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит комментарии в шарды, заданные COMMENT_SHARDS: из основной '
+        'базы, из шардов с устаревшей раскладкой и из выводимых баз.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--source', action='append', default=[],
+            help='Псевдоним выводимой базы, из которой забрать комментарии.',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.COMMENT_SHARDS:
+            raise CommandError('Шарды комментариев не настроены.')
+        sources = [DEFAULT_DB_ALIAS, *settings.COMMENT_SHARDS]
+        for alias in options['source']:
+            if alias not in connections:
+                raise CommandError(f'Неизвестная база: {alias}')
+            if alias not in sources:
+                sources.append(alias)
+        moved = sum(
+            self.drain(alias, options['batch_size']) for alias in sources
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Перенесено комментариев: {moved}')
+        )
+
+    def drain(self, source, batch_size):
+        moved = 0
+        last_id = 0
+        while True:
+            batch = list(
+                Comment.objects.using(source)
+                .filter(id__gt=last_id).order_by('id')[:batch_size]
+            )
+            if not batch:
+                return moved
+            last_id = batch[-1].id
+            targets = {}
+            for comment in batch:
+                target = shard_for(comment.post_id)
+                if target != source:
+                    targets.setdefault(target, []).append(comment)
+            for target, comments in targets.items():
+                moved += self.move(comments, source, target)
+
+    def move(self, comments, source, target):
+        # Сначала запись в шард, потом удаление: при сбое комментарий
+        # останется в обеих базах, и повторный запуск доведёт перенос.
+        with transaction.atomic(using=source):
+            with transaction.atomic(using=target):
+                Comment.objects.using(target).bulk_create(
+                    comments, ignore_conflicts=True
+                )
+            # ignore_conflicts молча пропускает занятые идентификаторы, поэтому
+            # из источника удаляем только то, что действительно есть в шарде.
+            stored = set(Comment.objects.using(target).filter(
+                id__in=[comment.id for comment in comments]
+            ).values_list('id', 'post_id', 'author_id'))
+            confirmed = {
+                comment.id for comment in comments
+                if (comment.id, comment.post_id, comment.author_id) in stored
+            }
+            for comment in comments:
+                if comment.id not in confirmed:
+                    self.stderr.write(
+                        f'Комментарий {comment.id} не перенесён из {source}: '
+                        f'в {target} этот идентификатор занят другим.'
+                    )
+            # Удаление без сигналов: счётчики публикаций не меняются.
+            Comment.objects.using(source).filter(
+                id__in=confirmed
+            )._raw_delete(source)
+        return len(confirmed)
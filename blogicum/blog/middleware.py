@@ -0,0 +1,56 @@
+from http import HTTPStatus
+
+from django.conf import settings
+from django.http import HttpResponse
+
+from .scheduling import release_if_due
+from .writer import WriteUnavailable
+
+STICKY_COOKIE = 'use_primary'
+
+
+class ScheduledPublicationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        release_if_due()
+        return self.get_response(request)
+
+
+class WriteUnavailableMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, WriteUnavailable):
+            return None
+        response = HttpResponse(
+            'Сервер перегружен, повторите попытку позже.',
+            status=HTTPStatus.SERVICE_UNAVAILABLE,
+        )
+        response['Retry-After'] = settings.DB_WRITE_RETRY_AFTER
+        return response
+
+
+class PrimaryStickinessMiddleware:
+    """После записи читает с основной базы, пока реплики не догонят её."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.use_primary = STICKY_COOKIE in request.COOKIES
+        response = self.get_response(request)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and (
+            response.status_code < HTTPStatus.BAD_REQUEST
+        ):
+            response.set_cookie(
+                STICKY_COOKIE, '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
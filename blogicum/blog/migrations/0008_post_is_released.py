@@ -0,0 +1,47 @@
+# Generated by Django 3.2.16 on 2026-10-18 18:54
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fill_is_released(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    Post.objects.filter(pub_date__lte=timezone.now()).update(is_released=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_feed_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_category_feed_idx',
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='is_released',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Время публикации наступило'),
+        ),
+        migrations.RunPython(
+            fill_is_released, migrations.RunPython.noop, hints={'model_name': 'post'}
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_published', True), ('is_released', True)), fields=['-pub_date', '-id'], name='post_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_published', True), ('is_released', True)), fields=['category', '-pub_date', '-id'], name='post_category_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_released', False)), fields=['pub_date'], name='post_scheduled_idx'),
+        ),
+    ]
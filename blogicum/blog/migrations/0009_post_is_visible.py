@@ -0,0 +1,59 @@
+# Generated by Django 3.2.16 on 2026-10-18 18:58
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fill_is_visible(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    Post.objects.filter(
+        is_published=True,
+        pub_date__lte=timezone.now(),
+        category__is_published=True,
+    ).update(is_visible=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_post_is_released'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_feed_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_category_feed_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_scheduled_idx',
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='is_visible',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Видна в ленте'),
+        ),
+        migrations.RunPython(
+            fill_is_visible, migrations.RunPython.noop, hints={'model_name': 'post'}
+        ),
+        migrations.RemoveField(
+            model_name='post',
+            name='is_released',
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_visible', True)), fields=['-pub_date', '-id'], name='post_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_visible', True)), fields=['category', '-pub_date', '-id'], name='post_category_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_visible', False)), fields=['pub_date'], name='post_scheduled_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.16 on 2026-10-18 19:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_post_is_visible'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'id'], name='comment_post_id_idx'),
+        ),
+    ]
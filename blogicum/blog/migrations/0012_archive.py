@@ -0,0 +1,62 @@
+# Generated by Django 3.2.16 on 2026-10-18 19:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('blog', '0011_comment_shardable'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedPost',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('is_published', models.BooleanField(verbose_name='Опубликовано')),
+                ('created_at', models.DateTimeField(verbose_name='Добавлено')),
+                ('title', models.CharField(max_length=256, verbose_name='Заголовок')),
+                ('text', models.TextField(verbose_name='Текст')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата и время публикации')),
+                ('image', models.ImageField(blank=True, upload_to='', verbose_name='Фотография')),
+                ('comment_count', models.PositiveIntegerField(default=0, verbose_name='Количество комментариев')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Перенесено в архив')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_post', to=settings.AUTH_USER_MODEL, verbose_name='Автор публикации')),
+                ('category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_post', to='blog.category', verbose_name='Категория')),
+                ('location', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_post', to='blog.location', verbose_name='Местоположение')),
+            ],
+            options={
+                'verbose_name': 'архивная публикация',
+                'verbose_name_plural': 'Архив публикаций',
+                'ordering': ('-pub_date',),
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedComment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('is_published', models.BooleanField(verbose_name='Опубликовано')),
+                ('created_at', models.DateTimeField(verbose_name='Добавлено')),
+                ('text', models.TextField(verbose_name='Текст')),
+                ('author', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_comment', to=settings.AUTH_USER_MODEL, verbose_name='Автор комментария')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comment', to='blog.archivedpost', verbose_name='Пост комментария')),
+            ],
+            options={
+                'verbose_name': 'архивный комментарий',
+                'verbose_name_plural': 'Архив комментариев',
+                'ordering': ('-created_at',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedpost',
+            index=models.Index(fields=['author', '-pub_date', '-id'], name='archived_post_author_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedcomment',
+            index=models.Index(fields=['post', 'created_at'], name='archived_comment_post_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.16 on 2026-10-18 19:54
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0012_archive'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='comment',
+            name='comment_post_id_idx',
+        ),
+    ]
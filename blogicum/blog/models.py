@@ -1,5 +1,7 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models.functions import Now
+from django.utils import timezone
 
 
 User = get_user_model()
@@ -60,6 +62,37 @@ class Location(BaseModel):
         return self.name
 
 
+VISIBLE = models.Q(
+    is_published=True, pub_date__lte=Now(), category__is_published=True
+)
+VISIBILITY_FIELDS = {'is_published', 'pub_date', 'category', 'category_id'}
+
+
+class PostQuerySet(models.QuerySet):
+    def with_related(self):
+        return self.select_related('author', 'location', 'category')
+
+    def published(self):
+        return self.with_related().filter(
+            is_visible=True
+        ).order_by('-pub_date', '-id')
+
+    def visible_to(self, user):
+        condition = models.Q(is_visible=True)
+        if user.is_authenticated:
+            condition |= models.Q(author_id=user.id)
+        return self.with_related().filter(condition)
+
+    def refresh_visibility(self):
+        shown = self.filter(VISIBLE).exclude(
+            is_visible=True
+        ).update(is_visible=True)
+        hidden = self.exclude(VISIBLE).filter(
+            is_visible=True
+        ).update(is_visible=False)
+        return shown + hidden
+
+
 class Post(BaseModel):
     title = models.CharField(
         max_length=MAX_LENGTH,
@@ -100,39 +133,217 @@ class Post(BaseModel):
         blank=True,
         verbose_name='Фотография'
     )
+    comment_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество комментариев'
+    )
+    is_visible = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Видна в ленте'
+    )
+
+    objects = PostQuerySet.as_manager()
+    is_archived = False
 
     class Meta:
         verbose_name = 'публикация'
         verbose_name_plural = 'Публикации'
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'),
+                condition=models.Q(is_visible=True),
+                name='post_feed_idx',
+            ),
+            models.Index(
+                fields=('category', '-pub_date', '-id'),
+                condition=models.Q(is_visible=True),
+                name='post_category_feed_idx',
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_feed_idx',
+            ),
+            models.Index(
+                fields=('pub_date',),
+                condition=models.Q(is_visible=False),
+                name='post_scheduled_idx',
+            ),
+        )
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.is_visible = (
+            self.is_published
+            and self.pub_date <= timezone.now()
+            and self.category is not None
+            and self.category.is_published
+        )
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and VISIBILITY_FIELDS.intersection(
+            update_fields
+        ):
+            kwargs['update_fields'] = {
+                *update_fields, 'is_visible'
+            }
+        super().save(*args, **kwargs)
+
 
+# Комментарии могут жить в отдельных базах-шардах, где нет таблиц
+# публикаций и пользователей, поэтому внешние ключи не ограничены на
+# уровне базы; каскадное удаление выполняет ORM и сигналы.
 class Comment(BaseModel):
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         related_name="comment",
         verbose_name='Автор комментария',
-        null=True
+        null=True,
+        db_constraint=False
     )
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
         related_name="comment",
         verbose_name='Пост комментария',
-        blank=True
+        blank=True,
+        db_constraint=False
     )
     text = models.TextField(
         verbose_name='Текст'
     )
 
+    is_archived = False
+
     class Meta:
         verbose_name = 'комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ('-created_at',)
+        indexes = (
+            models.Index(
+                fields=('post', 'created_at'),
+                name='comment_post_created_idx',
+            ),
+        )
+
+    def __str__(self):
+        return self.text
+
+
+class ArchivedPostQuerySet(PostQuerySet):
+    # Флаг is_visible в архиве не обновляется, видимость считается заново.
+    def published(self):
+        return self.with_related().filter(VISIBLE).order_by('-pub_date', '-id')
+
+    def visible_to(self, user):
+        condition = VISIBLE
+        if user.is_authenticated:
+            condition |= models.Q(author_id=user.id)
+        return self.with_related().filter(condition)
+
+
+class ArchivedPost(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    is_published = models.BooleanField(verbose_name='Опубликовано')
+    created_at = models.DateTimeField(verbose_name='Добавлено')
+    title = models.CharField(
+        max_length=MAX_LENGTH,
+        verbose_name='Заголовок'
+    )
+    text = models.TextField(
+        verbose_name='Текст'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата и время публикации'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="archived_post",
+        verbose_name='Автор публикации'
+    )
+    location = models.ForeignKey(
+        Location,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="archived_post",
+        verbose_name='Местоположение'
+    )
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="archived_post",
+        verbose_name='Категория'
+    )
+    image = models.ImageField(
+        blank=True,
+        verbose_name='Фотография'
+    )
+    comment_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество комментариев'
+    )
+    archived_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Перенесено в архив'
+    )
+
+    objects = ArchivedPostQuerySet.as_manager()
+    is_archived = True
+
+    class Meta:
+        verbose_name = 'архивная публикация'
+        verbose_name_plural = 'Архив публикаций'
+        ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='archived_post_author_idx',
+            ),
+        )
+
+    def __str__(self):
+        return self.title
+
+
+class ArchivedComment(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    is_published = models.BooleanField(verbose_name='Опубликовано')
+    created_at = models.DateTimeField(verbose_name='Добавлено')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="archived_comment",
+        verbose_name='Автор комментария',
+        null=True
+    )
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name="comment",
+        verbose_name='Пост комментария'
+    )
+    text = models.TextField(
+        verbose_name='Текст'
+    )
+
+    is_archived = True
+
+    class Meta:
+        verbose_name = 'архивный комментарий'
+        verbose_name_plural = 'Архив комментариев'
+        ordering = ('-created_at',)
+        indexes = (
+            models.Index(
+                fields=('post', 'created_at'),
+                name='archived_comment_post_idx',
+            ),
+        )
 
     def __str__(self):
         return self.text
@@ -0,0 +1,299 @@
+import base64
+import binascii
+import heapq
+import itertools
+import json
+from collections.abc import Sequence
+from functools import reduce
+from operator import attrgetter, or_
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, InvalidPage, Page, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+FEED_COUNT_KEY = 'feed_count:{}:{}'
+
+
+def feed_count_key(scope, obj_id=None):
+    return FEED_COUNT_KEY.format(scope, obj_id or '')
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+class KeysetPage(Sequence):
+    """Страница выборки по курсору; запрос выполняется при первом чтении."""
+
+    def __init__(self, queryset, paginator, backwards=False, after=False):
+        self.queryset = queryset
+        self.paginator = paginator
+        self.backwards = backwards
+        self.after = after
+
+    def __repr__(self):
+        return '<KeysetPage of %s items>' % len(self.object_list)
+
+    def _fetch(self, limit):
+        return list(self.queryset[:limit])
+
+    @cached_property
+    def _result(self):
+        per_page = self.paginator.per_page
+        items = self._fetch(per_page + 1)
+        has_more = len(items) > per_page
+        items = items[:per_page]
+        if self.backwards:
+            items.reverse()
+            return items, True, has_more
+        return items, has_more, self.after
+
+    @property
+    def object_list(self):
+        return self._result[0]
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._result[1]
+
+    def has_previous(self):
+        return self._result[2]
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if not self.object_list:
+            return None
+        return self.paginator.encode_cursor(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self.object_list:
+            return None
+        return self.paginator.encode_cursor(self.object_list[0])
+
+
+class KeysetPaginator:
+    """Пагинация по ключу сортировки вместо LIMIT/OFFSET и COUNT(*)."""
+
+    is_keyset = True
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-id')):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        descending = {field.startswith('-') for field in self.ordering}
+        if len(descending) != 1:
+            raise ValueError(
+                'Все поля ключа должны сортироваться в одном направлении.'
+            )
+        self.descending = descending.pop()
+        self.fields = tuple(field.lstrip('-') for field in self.ordering)
+
+    def _model_field(self, name):
+        opts = self.object_list.model._meta
+        return opts.pk if name == 'pk' else opts.get_field(name)
+
+    def encode_cursor(self, obj):
+        values = [
+            self._model_field(name).value_to_string(obj)
+            for name in self.fields
+        ]
+        raw = json.dumps(values, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if not isinstance(values, list) or len(values) != len(
+                self.fields
+            ) or None in values:
+                # Поля сортировки не бывают пустыми.
+                raise ValueError
+            return [
+                self._clean_value(name, value)
+                for name, value in zip(self.fields, values)
+            ]
+        except (ValueError, TypeError, binascii.Error, ValidationError):
+            raise InvalidCursor('Некорректный курсор страницы.')
+
+    def _clean_value(self, name, value):
+        field = self._model_field(name)
+        value = field.to_python(value)
+        # Число вне диапазона столбца база не примет и ответит ошибкой.
+        ranges = connections[self.object_list.db].ops.integer_field_ranges
+        low, high = ranges.get(field.get_internal_type(), (None, None))
+        if low is not None and not low <= value <= high:
+            raise ValueError
+        return value
+
+    def _seek(self, values, forward):
+        lookup = 'lt' if self.descending == forward else 'gt'
+        conditions = []
+        for index, name in enumerate(self.fields):
+            condition = {
+                prefix: value
+                for prefix, value in zip(self.fields[:index], values)
+            }
+            condition[f'{name}__{lookup}'] = values[index]
+            conditions.append(Q(**condition))
+        # Граница по первому полю позволяет СУБД начать обход индекса
+        # с нужного места, а не фильтровать его целиком.
+        bound = Q(**{f'{self.fields[0]}__{lookup}e': values[0]})
+        return bound & reduce(or_, conditions)
+
+    def _reversed_ordering(self):
+        return tuple(
+            field.lstrip('-') if field.startswith('-') else f'-{field}'
+            for field in self.ordering
+        )
+
+    def _window(self, queryset, after, before):
+        if before:
+            return queryset.filter(
+                self._seek(self.decode_cursor(before), forward=False)
+            ).order_by(*self._reversed_ordering())
+        if after:
+            queryset = queryset.filter(
+                self._seek(self.decode_cursor(after), forward=True)
+            )
+        return queryset.order_by(*self.ordering)
+
+    def page(self, after=None, before=None):
+        if after and before:
+            raise InvalidCursor('Укажите только один из курсоров.')
+        return KeysetPage(
+            self._window(self.object_list, after, before), self,
+            backwards=bool(before), after=bool(after),
+        )
+
+
+class ArchiveKeysetPage(KeysetPage):
+    def __init__(self, queryset, archived, paginator, **kwargs):
+        super().__init__(queryset, paginator, **kwargs)
+        self.archived = archived
+
+    def _fetch(self, limit):
+        items = super()._fetch(limit)
+        key = attrgetter(*self.paginator.fields)
+        if self.archived is None or (
+            not self.backwards and len(items) == limit
+            and getattr(items[-1], self.paginator.fields[0])
+            >= self.paginator.boundary
+        ):
+            return items
+        merged = heapq.merge(
+            items, self.archived[:limit], key=key, reverse=not self.backwards
+        )
+        return list(itertools.islice(merged, limit))
+
+
+class ArchiveKeysetPaginator(KeysetPaginator):
+    """Keyset-пагинация по рабочей выборке с продолжением в архиве.
+
+    В архиве первое поле ключа меньше ``boundary``, поэтому архив
+    читается, только когда страница до этой границы не заполнилась.
+    """
+
+    def __init__(self, object_list, archived, per_page, boundary,
+                 ordering=('-pub_date', '-id')):
+        super().__init__(object_list, per_page, ordering=ordering)
+        if not self.descending:
+            raise ValueError('Архив продолжает только убывающий ключ.')
+        self.archived = archived
+        self.boundary = boundary
+
+    def page(self, after=None, before=None):
+        if after and before:
+            raise InvalidCursor('Укажите только один из курсоров.')
+        archived = self._window(self.archived, after, before)
+        if before and self.decode_cursor(before)[0] >= self.boundary:
+            archived = None
+        return ArchiveKeysetPage(
+            self._window(self.object_list, after, before), archived, self,
+            backwards=bool(before), after=bool(after),
+        )
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator, хранящий число записей ленты в кеше.
+
+    Если лента длиннее ``approximate_after`` записей, точный COUNT(*) не
+    выполняется: берётся оценка планировщика СУБД (там, где она есть), а
+    номера страниц за пределами оценки не отбрасываются.
+    """
+
+    def __init__(self, object_list, per_page, cache_key=None,
+                 timeout=None, approximate_after=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.cache_key = cache_key
+        self.timeout = (
+            settings.FEED_COUNT_CACHE_TIMEOUT if timeout is None else timeout
+        )
+        self.approximate_after = (
+            settings.FEED_COUNT_APPROXIMATE_AFTER
+            if approximate_after is None else approximate_after
+        )
+
+    @cached_property
+    def _count_info(self):
+        if self.cache_key is not None:
+            cached = cache.get(self.cache_key)
+            if cached is not None:
+                return cached
+        info = self._compute_count()
+        if self.cache_key is not None:
+            cache.set(self.cache_key, info, self.timeout)
+        return info
+
+    def _compute_count(self):
+        queryset = self.object_list.order_by()
+        if not self.approximate_after:
+            return queryset.count(), False
+        bounded = queryset[:self.approximate_after + 1].count()
+        if bounded <= self.approximate_after:
+            return bounded, False
+        return max(self._estimate_count(queryset), bounded), True
+
+    def _estimate_count(self, queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return 0
+        plan = json.loads(queryset.explain(format='json'))
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    @cached_property
+    def count(self):
+        return self._count_info[0]
+
+    @property
+    def count_is_approximate(self):
+        return self._count_info[1]
+
+    def validate_number(self, number):
+        if (self.count_is_approximate and str(number).isdigit()
+                and int(number) > self.num_pages):
+            return int(number)
+        return super().validate_number(number)
+
+    def page(self, number):
+        if not self.count_is_approximate:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        object_list = list(self.object_list[bottom:bottom + self.per_page])
+        if not object_list and number > 1:
+            raise EmptyPage('Страница не содержит результатов.')
+        return Page(object_list, number, self)
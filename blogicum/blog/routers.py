@@ -0,0 +1,103 @@
+import itertools
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from .sharding import shard_for
+
+COMMENT = 'blog.Comment'
+POST = 'blog.Post'
+
+_replica = ContextVar('replica', default=None)
+_turns = itertools.count()
+
+
+def choose_replica():
+    replicas = settings.DATABASE_REPLICAS
+    if not replicas:
+        return None
+    return replicas[next(_turns) % len(replicas)]
+
+
+@contextmanager
+def replica_reads(request):
+    # Одна реплика на весь запрос: у разных реплик разное отставание,
+    # и страница не должна собираться из данных разного возраста.
+    alias = None if getattr(request, 'use_primary', False) else (
+        choose_replica()
+    )
+    token = _replica.set(alias)
+    try:
+        yield alias
+    finally:
+        _replica.reset(token)
+
+
+class CommentShardRouter:
+    """Кладёт комментарии в шард по post_id, остальное — в основную базу."""
+
+    def get_comment_shard(self, hints):
+        instance = hints.get('instance')
+        if instance is None:
+            return None
+        if instance._meta.label == COMMENT:
+            post_id = instance.post_id
+        elif instance._meta.label == POST:
+            post_id = instance.pk
+        else:
+            return None
+        return shard_for(post_id) if post_id is not None else None
+
+    def comment_relation_db(self, hints):
+        # Публикация и автор комментария из шарда живут в основной базе.
+        instance = hints.get('instance')
+        if instance is not None and instance._meta.label == COMMENT:
+            return _replica.get() or DEFAULT_DB_ALIAS
+        return None
+
+    def db_for_read(self, model, **hints):
+        if not settings.COMMENT_SHARDS:
+            return None
+        if model._meta.label == COMMENT:
+            return self.get_comment_shard(hints)
+        return self.comment_relation_db(hints)
+
+    def db_for_write(self, model, **hints):
+        if not settings.COMMENT_SHARDS:
+            return None
+        if model._meta.label == COMMENT:
+            return self.get_comment_shard(hints)
+        return self.comment_relation_db(hints) and DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if settings.COMMENT_SHARDS and COMMENT in (
+            obj1._meta.label, obj2._meta.label
+        ):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.COMMENT_SHARDS:
+            return app_label == 'blog' and model_name == 'comment'
+        return None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _replica.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,59 @@
+import time
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .cache import NEXT_RELEASE_KEY
+from .models import Post
+from .signals import posts_released
+from .writer import run_write
+
+RELEASE_BATCH_SIZE = 500
+
+
+def scheduled_posts():
+    return Post.objects.filter(
+        is_visible=False, is_published=True, category__is_published=True
+    )
+
+
+def get_next_release_date():
+    return scheduled_posts().order_by(
+        'pub_date'
+    ).values_list('pub_date', flat=True).first()
+
+
+def release_due_posts(now=None):
+    now = now or timezone.now()
+    released = 0
+
+    def release_batch():
+        due = list(
+            scheduled_posts().filter(pub_date__lte=now).values(
+                'id', 'category_id', 'author_id'
+            )[:RELEASE_BATCH_SIZE]
+        )
+        Post.objects.filter(
+            id__in=[post['id'] for post in due]
+        ).update(is_visible=True)
+        return due
+
+    while True:
+        due = run_write(release_batch)
+        if not due:
+            break
+        posts_released.send(sender=Post, posts=due)
+        released += len(due)
+    cache.delete(NEXT_RELEASE_KEY)
+    return released
+
+
+def release_if_due():
+    next_release = cache.get(NEXT_RELEASE_KEY)
+    if next_release is None:
+        next_date = get_next_release_date()
+        next_release = next_date.timestamp() if next_date else float('inf')
+        cache.set(NEXT_RELEASE_KEY, next_release, None)
+    if time.time() >= next_release:
+        return release_due_posts()
+    return 0
@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .models import Comment
+
+# Идентификатор комментария: миллисекунды с 2020-01-01 (41 бит), номер
+# процесса COMMENT_ID_NODE (10 бит) и счётчик внутри миллисекунды (12 бит).
+# Он уникален во всех шардах, поэтому комментарий можно перенести между ними.
+ID_EPOCH_MS = 1_577_836_800_000
+NODE_BITS = 10
+SEQUENCE_BITS = 12
+
+
+def is_sharded():
+    return bool(settings.COMMENT_SHARDS)
+
+
+def shard_for(post_id, shards=None):
+    shards = settings.COMMENT_SHARDS if shards is None else shards
+    return shards[post_id % len(shards)]
+
+
+def comments_for_post(post_id):
+    if not is_sharded():
+        return Comment.objects.filter(post_id=post_id)
+    return Comment.objects.using(shard_for(post_id)).filter(post_id=post_id)
+
+
+def comments_for_posts(post_ids):
+    if not is_sharded():
+        return [Comment.objects.filter(post_id__in=post_ids)]
+    shards = defaultdict(list)
+    for post_id in post_ids:
+        shards[shard_for(post_id)].append(post_id)
+    return [
+        Comment.objects.using(alias).filter(post_id__in=ids)
+        for alias, ids in shards.items()
+    ]
+
+
+def with_authors(comments):
+    # Авторы лежат в основной базе, и JOIN с шардом невозможен.
+    if is_sharded():
+        return comments.prefetch_related('author')
+    return comments.select_related('author')
+
+
+def comment_querysets():
+    if not is_sharded():
+        return [Comment.objects.all()]
+    return [Comment.objects.using(alias) for alias in settings.COMMENT_SHARDS]
+
+
+class CommentIdGenerator:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.last_ms = 0
+        self.sequence = 0
+
+    @property
+    def node(self):
+        node = settings.COMMENT_ID_NODE
+        if not 0 <= node < 1 << NODE_BITS:
+            raise ImproperlyConfigured(
+                f'COMMENT_ID_NODE должен быть от 0 до {(1 << NODE_BITS) - 1}.'
+            )
+        return node
+
+    def __call__(self):
+        node = self.node
+        with self.lock:
+            now_ms = max(time.time_ns() // 1_000_000, self.last_ms)
+            if now_ms == self.last_ms:
+                self.sequence = (self.sequence + 1) % (1 << SEQUENCE_BITS)
+                if self.sequence == 0:
+                    now_ms += 1
+            else:
+                self.sequence = 0
+            self.last_ms = now_ms
+            return (
+                (now_ms - ID_EPOCH_MS) << (NODE_BITS + SEQUENCE_BITS)
+                | node << SEQUENCE_BITS
+                | self.sequence
+            )
+
+
+next_comment_id = CommentIdGenerator()
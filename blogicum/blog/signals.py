@@ -0,0 +1,246 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import Signal, receiver
+
+from .cache import NEXT_RELEASE_KEY, bump_tags
+from .counters import change_comment_count
+from .models import Category, Comment, Location, Post
+from .paginators import feed_count_key
+from .sharding import (comment_querysets, comments_for_post, is_sharded,
+                       next_comment_id)
+
+User = get_user_model()
+FEED_FIELDS = (
+    'is_visible', 'is_published', 'pub_date', 'category_id', 'author_id'
+)
+
+posts_released = Signal()
+comments_flushed = Signal()
+posts_archived = Signal()
+
+
+@receiver(pre_save, sender=Comment)
+def assign_sharded_comment_id(sender, instance, raw=False, **kwargs):
+    if is_sharded() and instance.pk is None and not raw:
+        instance.pk = next_comment_id()
+
+
+@receiver(pre_delete, sender=Post)
+def delete_sharded_post_comments(sender, instance, **kwargs):
+    # Каскад ORM ищет комментарии в базе публикации, а не в шарде.
+    if is_sharded():
+        comments_for_post(instance.pk).delete()
+
+
+@receiver(pre_delete, sender=User)
+def delete_sharded_user_comments(sender, instance, **kwargs):
+    if is_sharded():
+        for comments in comment_querysets():
+            comments.filter(author=instance).delete()
+
+
+@receiver(post_save, sender=Comment)
+def increment_comment_count(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change_comment_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comment_count(sender, instance, **kwargs):
+    change_comment_count(instance.post_id, -1)
+
+
+def invalidate_feed_counts(category_ids=(), author_ids=()):
+    keys = [feed_count_key('index')]
+    keys += [feed_count_key('category', pk) for pk in category_ids if pk]
+    for pk in filter(None, author_ids):
+        keys += [
+            feed_count_key('profile', pk), feed_count_key('profile_own', pk)
+        ]
+    cache.delete_many(keys)
+
+
+@receiver(pre_save, sender=Post)
+def remember_feed_fields(sender, instance, raw=False, **kwargs):
+    instance._feed_fields = None
+    if instance.pk and not raw:
+        instance._feed_fields = Post.objects.filter(
+            pk=instance.pk
+        ).values(*FEED_FIELDS).first()
+
+
+@receiver(post_save, sender=Post)
+def invalidate_feed_counts_on_save(sender, instance, created, **kwargs):
+    old = getattr(instance, '_feed_fields', None)
+    if not created and old and all(
+        old[field] == getattr(instance, field) for field in FEED_FIELDS
+    ):
+        return
+    old = old or {}
+    invalidate_feed_counts(
+        category_ids={instance.category_id, old.get('category_id')},
+        author_ids={instance.author_id, old.get('author_id')},
+    )
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_feed_counts_on_delete(sender, instance, **kwargs):
+    invalidate_feed_counts(
+        category_ids=(instance.category_id,),
+        author_ids=(instance.author_id,),
+    )
+
+
+@receiver(post_save, sender=Category)
+def refresh_category_visibility(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    posts = Post.objects.filter(category=instance)
+    if posts.refresh_visibility():
+        invalidate_feed_counts(
+            category_ids=(instance.pk,),
+            author_ids=set(posts.values_list('author_id', flat=True)),
+        )
+
+
+@receiver(post_delete, sender=Category)
+def hide_uncategorized_posts(sender, instance, **kwargs):
+    posts = Post.objects.filter(category__isnull=True, is_visible=True)
+    author_ids = set(posts.values_list('author_id', flat=True))
+    posts.update(is_visible=False)
+    invalidate_feed_counts(category_ids=(instance.pk,), author_ids=author_ids)
+
+
+def invalidate_post_pages(post_ids=(), category_ids=()):
+    slugs = Category.objects.filter(
+        pk__in=[pk for pk in category_ids if pk]
+    ).values_list('slug', flat=True)
+    bump_tags(
+        'feed',
+        *(f'post:{pk}' for pk in post_ids),
+        *(f'category:{slug}' for slug in slugs),
+    )
+
+
+@receiver(post_save, sender=Post)
+def forget_next_release(sender, instance, **kwargs):
+    if not instance.is_visible:
+        cache.delete(NEXT_RELEASE_KEY)
+
+
+@receiver(post_save, sender=Category)
+def forget_next_release_on_category_change(sender, instance, **kwargs):
+    # Отложенные публикации учитываются только в опубликованных
+    # категориях, поэтому смена категории меняет дату следующего выпуска.
+    cache.delete(NEXT_RELEASE_KEY)
+
+
+@receiver(posts_released)
+def invalidate_released_posts(sender, posts, **kwargs):
+    category_ids = {post['category_id'] for post in posts}
+    invalidate_feed_counts(
+        category_ids=category_ids,
+        author_ids={post['author_id'] for post in posts},
+    )
+    invalidate_post_pages(
+        post_ids=[post['id'] for post in posts], category_ids=category_ids
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_pages_on_post_change(sender, instance, **kwargs):
+    old = getattr(instance, '_feed_fields', None) or {}
+    invalidate_post_pages(
+        post_ids=(instance.pk,),
+        category_ids={instance.category_id, old.get('category_id')},
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_pages_on_comment_change(sender, instance, **kwargs):
+    category_ids = Post.objects.filter(
+        pk=instance.post_id
+    ).values_list('category_id', flat=True)
+    invalidate_post_pages(
+        post_ids=(instance.post_id,), category_ids=list(category_ids)
+    )
+    bump_tags(f'comments:{instance.post_id}')
+
+
+@receiver(comments_flushed)
+def invalidate_flushed_comments(sender, post_ids, category_ids, **kwargs):
+    invalidate_post_pages(post_ids=post_ids, category_ids=category_ids)
+    bump_tags(*(f'comments:{pk}' for pk in post_ids))
+
+
+@receiver(posts_archived)
+def invalidate_archived_posts(sender, posts, **kwargs):
+    category_ids = {post['category_id'] for post in posts}
+    invalidate_feed_counts(
+        category_ids=category_ids,
+        author_ids={post['author_id'] for post in posts},
+    )
+    invalidate_post_pages(
+        post_ids=[post['id'] for post in posts], category_ids=category_ids
+    )
+    bump_tags(
+        *(f'comments:{post["id"]}' for post in posts),
+        *(f'profile:{post["author__username"]}' for post in posts),
+    )
+
+
+@receiver(pre_save, sender=User)
+def remember_username(sender, instance, update_fields=None, **kwargs):
+    instance._old_username = None
+    if instance.pk and (update_fields is None or 'username' in update_fields):
+        instance._old_username = User.objects.filter(
+            pk=instance.pk
+        ).values_list('username', flat=True).first()
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_pages(sender, instance, created, **kwargs):
+    if created:
+        return
+    tags = [f'profile:{instance.username}']
+    old_username = getattr(instance, '_old_username', None)
+    if old_username not in (None, instance.username):
+        commented = {
+            post_id for comments in comment_querysets()
+            for post_id in comments.filter(
+                author=instance
+            ).values_list('post_id', flat=True).distinct()
+        }
+        authored = dict(Post.objects.filter(
+            author=instance
+        ).values_list('id', 'category_id'))
+        tags.append(f'profile:{old_username}')
+        tags += [f'comments:{pk}' for pk in commented]
+        invalidate_post_pages(
+            post_ids={*commented, *authored},
+            category_ids=set(authored.values()),
+        )
+    bump_tags(*tags)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def invalidate_pages_on_taxonomy_change(sender, instance, **kwargs):
+    bump_tags('taxonomy')
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRAGMAS:
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
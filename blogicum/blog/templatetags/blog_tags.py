@@ -0,0 +1,49 @@
+import re
+
+from django import template
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+ACTIONS_SLOT = '<!--comment-actions:{}:{}:{}-->'
+ACTIONS_SLOT_RE = re.compile(r'<!--comment-actions:(\d+):(\d+):(\d*)-->')
+
+
+@register.simple_tag
+def comment_actions_slot(comment):
+    if comment.id is None or comment.is_archived:
+        return ''
+    return mark_safe(ACTIONS_SLOT.format(
+        comment.post_id, comment.id, comment.author_id or ''
+    ))
+
+
+class CommentActionsNode(template.Node):
+    def __init__(self, nodelist):
+        self.nodelist = nodelist
+
+    def render(self, context):
+        html = self.nodelist.render(context)
+        user = context.get('user')
+        if user is None or not user.is_authenticated:
+            return ACTIONS_SLOT_RE.sub('', html)
+        actions = context.template.engine.get_template(
+            'includes/comment_actions.html'
+        )
+        own_id = str(user.id)
+
+        def fill(match):
+            if match[3] != own_id:
+                return ''
+            with context.push(post_id=match[1], comment_id=match[2]):
+                return actions.render(context)
+
+        return ACTIONS_SLOT_RE.sub(fill, html)
+
+
+@register.tag
+def comment_actions(parser, token):
+    """Подставляет кнопки автора в общий для всех закешированный HTML."""
+    nodelist = parser.parse(('endcomment_actions',))
+    parser.delete_first_token()
+    return CommentActionsNode(nodelist)
@@ -36,11 +36,21 @@ urlpatterns = [
         views.PostDelete.as_view(),
         name='delete_post'
     ),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.CommentList.as_view(),
+        name='comments'
+    ),
     path(
         'add_comment/<int:post_id>/',
         views.AddComment.as_view(),
         name='add_comment'
     ),
+    path(
+        'posts/<int:post_id>/comments/add/',
+        views.AddCommentFragment.as_view(),
+        name='add_comment_fragment'
+    ),
     path(
         'posts/<int:post_id>/edit_comment/<int:comment_id>/',
         views.EditComment.as_view(),
@@ -61,4 +71,9 @@ urlpatterns = [
         views.PostCreate.as_view(),
         name='create_post'
     ),
+    path(
+        'deletions/<str:job_id>/',
+        views.DeletionStatus.as_view(),
+        name='deletion_status'
+    ),
 ]
@@ -1,58 +1,109 @@
+import hashlib
+from http import HTTPStatus
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.db.models import Count
-from django.db.models.functions import Now
-from django.http import Http404
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
+from django.http import Http404, HttpResponseBadRequest, JsonResponse
 from django.shortcuts import get_object_or_404, redirect
+from django.middleware.csrf import get_token
 from django.urls import reverse, reverse_lazy
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from django.views.generic import (CreateView, DeleteView, DetailView, ListView,
-                                  UpdateView)
+                                  TemplateView, UpdateView, View)
 from django.views.generic.edit import FormMixin
 
+from .archive import archive_cutoff
+from .buffering import comment_buffer
+from .cache import (CACHE_HEADER, attach_card_versions, get_tag_versions,
+                    is_page_cacheable, page_cache_key, store_page,
+                    tags_changed_within)
+from .deletion import get_progress, start_deletion
 from .forms import CommentForm, PostForm
-from .models import Category, Comment, Post
+from .models import ArchivedComment, ArchivedPost, Category, Comment, Post
+from .paginators import (ArchiveKeysetPaginator, CachedCountPaginator,
+                         InvalidCursor, KeysetPaginator, feed_count_key)
+from .routers import replica_reads
+from .sharding import comments_for_post, with_authors
+from .writer import run_write
 
 UserModel = get_user_model()
 PAGINATION = 10
+COMMENTS_PAGINATION = 50
 
 
-class PostPermissionMixin:
-    def get_object(self):
+def get_visible_post(user, post_id):
+    # Старые публикации лежат в архиве; в рабочей таблице ищем сначала.
+    try:
+        return Post.objects.visible_to(user).get(id=post_id)
+    except Post.DoesNotExist:
         return get_object_or_404(
-            Post.objects,
-            id=self.kwargs.get(self.post_id_url_kwarg)
+            ArchivedPost.objects.visible_to(user), id=post_id
         )
 
-    def test_func(self):
-        username = Post.objects.filter(
-            id=self.kwargs.get(self.post_id_url_kwarg)
-        ).values('author__username').first()
-        try:
-            return self.request.user.username == username.get(
-                'author__username'
-            )
-        except AttributeError:
-            raise Http404()
 
+class AuthorPermissionMixin(UserPassesTestMixin):
+    """Загружает объект один раз и сверяет его автора с пользователем."""
 
-class CommentPermissionMixin:
-    def get_object(self):
-        return get_object_or_404(
-            Comment,
-            id=self.kwargs.get(self.comment_id_url_kwarg)
-        )
+    permission_queryset = None
+    object_id_url_kwarg = None
 
-    def test_func(self):
-        username = Comment.objects.filter(
-            id=self.kwargs['comment_id']
-        ).values('author__username').first()
-        try:
-            return self.request.user.username == username.get(
-                'author__username'
+    def get_permission_lookup(self):
+        return {'id': self.kwargs.get(self.object_id_url_kwarg)}
+
+    def get_permission_queryset(self):
+        return self.permission_queryset
+
+    def get_permission_object(self):
+        if not hasattr(self, '_permission_object'):
+            self._permission_object = get_object_or_404(
+                self.get_permission_queryset(),
+                **self.get_permission_lookup()
             )
-        except AttributeError:
-            raise Http404()
+        return self._permission_object
+
+    def get_object(self, queryset=None):
+        return self.get_permission_object()
+
+    def test_func(self):
+        return self.get_permission_object().author_id == self.request.user.id
+
+
+class RunWriteMixin:
+    """Сохраняет и удаляет объект через run_write."""
+
+    def form_valid(self, form):
+        self.object = run_write(form.save)
+        return redirect(self.get_success_url())
+
+    def delete(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        success_url = self.get_success_url()
+        run_write(self.object.delete)
+        return redirect(success_url)
+
+
+class PostPermissionMixin(AuthorPermissionMixin):
+    permission_queryset = Post.objects.all()
+    object_id_url_kwarg = 'post_id'
+
+
+class CommentPermissionMixin(AuthorPermissionMixin):
+    permission_queryset = Comment.objects.all()
+    object_id_url_kwarg = 'comment_id'
+
+    def get_permission_queryset(self):
+        return comments_for_post(self.kwargs['post_id'])
+
+    def get_permission_lookup(self):
+        return {
+            'post_id': self.kwargs['post_id'],
+            'id': self.kwargs[self.object_id_url_kwarg],
+        }
 
     def get_success_url(self):
         return reverse(
@@ -61,50 +112,210 @@ class CommentPermissionMixin:
         )
 
 
-class Index(ListView):
-    template_name = 'blog/index.html'
-    model = Post
+class ConditionalGetMixin:
+    """Отвечает 304 по версиям тегов страницы, не обращаясь к базе."""
+
+    def get_validators(self):
+        versions = get_tag_versions(self.get_cache_tags())
+        user = self.request.user
+        parts = [
+            self.request.get_full_path(), user.pk, user.get_username(),
+            *versions,
+        ]
+        if user.is_authenticated:
+            # Страницы для вошедших содержат формы с CSRF-токеном, а вход
+            # меняет токен: страница со старым не должна отдаваться через
+            # 304. get_token выпускает токен, если его ещё нет.
+            get_token(self.request)
+            parts.append(self.request.META['CSRF_COOKIE'])
+        digest = hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+        return f'"{digest}"', max(versions) // 10 ** 9
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        etag, last_modified = self.get_validators()
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+        if response.status_code in (HTTPStatus.OK, HTTPStatus.NOT_MODIFIED):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            patch_cache_control(
+                response, no_cache=True,
+                private=request.user.is_authenticated,
+            )
+        return response
+
+
+class ReplicaReadMixin:
+    """Читает страницу с реплики; шаблон рендерится там же."""
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        # ETag и ключ кеша страницы уже учитывают свежую запись, а реплика
+        # может её ещё не получить: такую страницу читаем с основной базы,
+        # иначе устаревшая копия закрепится под новыми версиями тегов.
+        if tags_changed_within(
+            self.get_cache_tags(), settings.REPLICA_STICKY_SECONDS
+        ):
+            request.use_primary = True
+        with replica_reads(request):
+            response = super().dispatch(request, *args, **kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+        return response
+
+
+class AnonymousPageCacheMixin:
+    cache_tags = ()
+
+    def get_cache_tags(self):
+        return self.cache_tags
+
+    def dispatch(self, request, *args, **kwargs):
+        if not is_page_cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+        key = page_cache_key(request, self.get_cache_tags())
+        response = cache.get(key)
+        if response is not None:
+            response[CACHE_HEADER] = 'HIT'
+            return response
+        response = super().dispatch(request, *args, **kwargs)
+        response[CACHE_HEADER] = 'MISS'
+        if hasattr(response, 'add_post_render_callback'):
+            response.add_post_render_callback(
+                lambda rendered: store_page(key, rendered)
+            )
+        else:
+            store_page(key, response)
+        return response
+
+
+class PostCardCacheMixin:
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        attach_card_versions(context['page_obj'])
+        context['post_card_timeout'] = settings.POST_CARD_CACHE_TIMEOUT
+        return context
+
+
+class CommentPageMixin:
+    comments_per_page = COMMENTS_PAGINATION
+
+    def get_comment_queryset(self, post):
+        if post.is_archived:
+            return ArchivedComment.objects.select_related('author').filter(
+                post_id=post.id
+            )
+        return with_authors(comments_for_post(post.id))
+
+    def get_comments_context(self, post, after=None):
+        paginator = KeysetPaginator(
+            self.get_comment_queryset(post),
+            self.comments_per_page,
+            ordering=('created_at', 'id'),
+        )
+        try:
+            comments = paginator.page(after=after)
+        except InvalidCursor:
+            raise Http404('Некорректный курсор страницы.')
+        return {
+            'comments': comments,
+            'comments_after': after or '',
+            'comments_version': get_tag_versions([f'comments:{post.id}'])[0],
+            'comment_list_timeout': settings.COMMENT_LIST_CACHE_TIMEOUT,
+        }
+
+
+class KeysetPaginationMixin:
     paginate_by = PAGINATION
+    paginator_class = CachedCountPaginator
+    keyset_ordering = ('-pub_date', '-id')
+    count_scope = None
 
-    def get_queryset(self):
-        queryset = Post.objects.filter(
-            pub_date__lte=Now(),
-            is_published=True,
-            category__is_published=True
-        ).order_by('-pub_date')
-        query_set = queryset.annotate(
-            comment_count=Count('comment')
+    def get_count_cache_key(self):
+        return feed_count_key(self.count_scope)
+
+    def get_paginator(self, queryset, per_page, **kwargs):
+        return super().get_paginator(
+            queryset, per_page, cache_key=self.get_count_cache_key(),
+            **kwargs
         )
 
-        return query_set
+    def get_keyset_paginator(self, queryset, page_size):
+        return KeysetPaginator(
+            queryset, page_size, ordering=self.keyset_ordering
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.page_kwarg in self.request.GET:
+            return super().paginate_queryset(
+                queryset.order_by(*self.keyset_ordering), page_size
+            )
+        paginator = self.get_keyset_paginator(queryset, page_size)
+        try:
+            page = paginator.page(
+                after=self.request.GET.get('after'),
+                before=self.request.GET.get('before'),
+            )
+        except InvalidCursor:
+            raise Http404('Некорректный курсор страницы.')
+        return paginator, page, page.object_list, page.has_other_pages()
 
 
-class PostDetail(FormMixin, DetailView):
+class Index(ConditionalGetMixin, AnonymousPageCacheMixin, ReplicaReadMixin,
+            PostCardCacheMixin, KeysetPaginationMixin, ListView):
+    template_name = 'blog/index.html'
     model = Post
+    count_scope = 'index'
+    cache_tags = ('feed', 'taxonomy')
+
+    def get_queryset(self):
+        return Post.objects.published()
+
+
+class PostDetail(ConditionalGetMixin, AnonymousPageCacheMixin,
+                 ReplicaReadMixin, CommentPageMixin, FormMixin, DetailView):
+    model = Post
+    context_object_name = 'post'
     template_name = 'blog/detail.html'
     success_url = reverse_lazy('blog:index')
     form_class = CommentForm
     post_id_url_kwarg = 'post_id'
 
+    def get_cache_tags(self):
+        return (f'post:{self.kwargs[self.post_id_url_kwarg]}', 'taxonomy')
+
     def get_object(self):
-        post = get_object_or_404(
-            Post.objects,
-            id=self.kwargs.get(self.post_id_url_kwarg)
+        return get_visible_post(
+            self.request.user, self.kwargs.get(self.post_id_url_kwarg)
         )
-        if (post.is_published
-            and post.category.is_published
-                and post.pub_date <= timezone.now()):
-            return post
-        elif self.request.user.id == post.author.id:
-            return post
-        else:
-            raise Http404()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["comments"] = Comment.objects.filter(
-            post=self.kwargs.get(self.post_id_url_kwarg)
-        ).order_by('created_at')
+        context.update(self.get_comments_context(
+            self.object, after=self.request.GET.get('comments_after')
+        ))
+        return context
+
+
+class CommentList(CommentPageMixin, TemplateView):
+    template_name = 'includes/comment_list.html'
+    post_id_url_kwarg = 'post_id'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        post = get_visible_post(
+            self.request.user, self.kwargs.get(self.post_id_url_kwarg)
+        )
+        context['post'] = post
+        context.update(self.get_comments_context(
+            post, after=self.request.GET.get('after')
+        ))
         return context
 
 
@@ -114,8 +325,9 @@ class PostCreate(LoginRequiredMixin, CreateView):
 
     def form_valid(self, form):
         form.instance.author = self.request.user
+        self.object = run_write(form.save)
 
-        return super().form_valid(form)
+        return redirect(self.get_success_url())
 
     def get_success_url(self):
         return reverse(
@@ -124,29 +336,33 @@ class PostCreate(LoginRequiredMixin, CreateView):
         )
 
 
-class PostEdit(PostPermissionMixin, UserPassesTestMixin, UpdateView):
+class PostEdit(PostPermissionMixin, RunWriteMixin, UpdateView):
     model = Post
     fields = ('title', 'text', 'pub_date', 'location', 'category', 'image')
     template_name = 'blog/create.html'
-    post_id_url_kwarg = 'post_id'
 
     def get_success_url(self):
         return reverse(
             'blog:post_detail',
-            kwargs={'post_id': self.kwargs.get(
-                self.post_id_url_kwarg
-            )}
+            kwargs={'post_id': self.kwargs.get(self.object_id_url_kwarg)}
         )
 
     def handle_no_permission(self):
         return redirect(self.get_success_url())
 
 
-class PostDelete(PostPermissionMixin, UserPassesTestMixin, DeleteView):
+class PostDelete(PostPermissionMixin, DeleteView):
     model = Post
     template_name = 'blog/create.html'
     success_url = reverse_lazy('blog:index')
-    post_id_url_kwarg = 'post_id'
+
+    def delete(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        progress = start_deletion(self.object, owner_id=request.user.id)
+        if progress.state == 'done':
+            return redirect(self.get_success_url())
+        # Фоновое удаление: автор следит за ходом по адресу задачи.
+        return redirect('blog:deletion_status', job_id=progress.job_id)
 
 
 class AddComment(LoginRequiredMixin, CreateView):
@@ -167,9 +383,12 @@ class AddComment(LoginRequiredMixin, CreateView):
         instance.post = get_object_or_404(
             Post, id=self.kwargs.get(self.post_id_url_kwarg)
         )
-        instance.save()
+        if settings.COMMENT_WRITE_BUFFER:
+            comment_buffer.add(instance)
+        else:
+            run_write(instance.save)
 
-        return super().form_valid(form)
+        return redirect(self.get_success_url())
 
     def get_success_url(self):
         return reverse(
@@ -178,61 +397,131 @@ class AddComment(LoginRequiredMixin, CreateView):
         )
 
 
-class EditComment(CommentPermissionMixin, UserPassesTestMixin, UpdateView):
+class AddCommentFragment(LoginRequiredMixin, CreateView):
+    """Сохраняет комментарий и возвращает только его разметку."""
+
+    form_class = CommentForm
+    template_name = 'includes/new_comment.html'
+    http_method_names = ('post',)
+
+    def wants_json(self):
+        return 'application/json' in self.request.headers.get('Accept', '')
+
+    def form_valid(self, form):
+        post_id = self.kwargs['post_id']
+        if not Post.objects.filter(id=post_id).exists():
+            raise Http404('Публикация не найдена.')
+        comment = form.save(commit=False)
+        comment.author = self.request.user
+        comment.post_id = post_id
+        if settings.COMMENT_WRITE_BUFFER:
+            comment_buffer.add(comment)
+            # Время для разметки ответа; в базе его проставит запись пачки.
+            comment.created_at = timezone.now()
+            status = HTTPStatus.ACCEPTED
+        else:
+            run_write(comment.save)
+            status = HTTPStatus.CREATED
+        response = self.render_to_response({'comment': comment}, status=status)
+        if not self.wants_json():
+            return response
+        return JsonResponse({
+            'id': comment.id,
+            'html': response.rendered_content,
+        }, status=status)
+
+    def form_invalid(self, form):
+        if self.wants_json():
+            return JsonResponse(
+                {'errors': form.errors.get_json_data()},
+                status=HTTPStatus.BAD_REQUEST,
+            )
+        return HttpResponseBadRequest(form.errors.as_ul())
+
+
+class EditComment(CommentPermissionMixin, RunWriteMixin, UpdateView):
     model = Comment
     fields = ('text',)
     template_name = 'blog/comment.html'
-    comment_id_url_kwarg = 'comment_id'
 
 
-class DeleteComment(CommentPermissionMixin, UserPassesTestMixin, DeleteView):
+class DeleteComment(CommentPermissionMixin, RunWriteMixin, DeleteView):
     model = Comment
     template_name = 'blog/comment.html'
-    comment_id_url_kwarg = 'comment_id'
 
 
-class CategoryView(ListView):
+class CategoryView(ConditionalGetMixin, AnonymousPageCacheMixin,
+                   ReplicaReadMixin, PostCardCacheMixin,
+                   KeysetPaginationMixin, ListView):
     model = Post
     template_name = 'blog/category.html'
-    paginate_by = PAGINATION
+    count_scope = 'category'
+
+    def get_cache_tags(self):
+        return (f'category:{self.kwargs["category_slug"]}', 'taxonomy')
+
+    def get_count_cache_key(self):
+        return feed_count_key(self.count_scope, self.category.id)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["category"] = get_object_or_404(
-            Category,
-            slug=self.kwargs['category_slug'],
-            is_published=True
-        )
+        context["category"] = self.category
         return context
 
     def get_queryset(self):
-        return Post.objects.filter(
-            category__slug=self.kwargs['category_slug'],
-            is_published=True,
-            pub_date__lte=Now(),
+        self.category = get_object_or_404(
+            Category,
+            slug=self.kwargs['category_slug'],
+            is_published=True
         )
+        return Post.objects.published().filter(category=self.category)
 
 
-class Profile(ListView):
+class Profile(ConditionalGetMixin, ReplicaReadMixin, PostCardCacheMixin,
+              KeysetPaginationMixin, ListView):
     model = Post
-    paginate_by = PAGINATION
     template_name = 'blog/profile.html'
+    count_scope = 'profile'
+
+    def get_cache_tags(self):
+        return (f'profile:{self.kwargs["username"]}', 'feed', 'taxonomy')
+
+    def get_count_cache_key(self):
+        scope = self.count_scope
+        if self.request.user == self.profile:
+            scope = f'{scope}_own'
+        return feed_count_key(scope, self.profile.id)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['profile'] = get_object_or_404(
-            UserModel,
-            username=self.kwargs['username']
-        )
+        context['profile'] = self.profile
         return context
 
-    def get_queryset(self):
-        queryset = Post.objects.filter(
-            author__username=self.kwargs['username']
-        ).order_by('-pub_date')
-        query_set = queryset.annotate(comment_count=Count('comment'))
+    def get_keyset_paginator(self, queryset, page_size):
+        # Архивные публикации идут в ленте профиля следом за рабочими;
+        # нумерованные страницы (?page=) архив не видят.
+        if not self.profile.has_archive:
+            return super().get_keyset_paginator(queryset, page_size)
+        return ArchiveKeysetPaginator(
+            queryset, self.get_posts(ArchivedPost), page_size,
+            boundary=archive_cutoff(), ordering=self.keyset_ordering,
+        )
 
-        return query_set
+    def get_posts(self, model):
+        if self.request.user == self.profile:
+            posts = model.objects.with_related().order_by('-pub_date', '-id')
+        else:
+            posts = model.objects.published()
+        return posts.filter(author=self.profile)
+
+    def get_queryset(self):
+        self.profile = get_object_or_404(
+            UserModel.objects.annotate(has_archive=Exists(
+                ArchivedPost.objects.filter(author=OuterRef('pk'))
+            )),
+            username=self.kwargs['username']
+        )
+        return self.get_posts(Post)
 
 
 class EditProfile(UserPassesTestMixin, UpdateView):
@@ -267,8 +556,24 @@ class EditProfile(UserPassesTestMixin, UpdateView):
         except AttributeError:
             raise Http404()
 
+    def form_valid(self, form):
+        self.object = run_write(form.save)
+        return redirect(self.get_success_url())
+
     def get_success_url(self):
         return reverse(
             'blog:profile',
             kwargs={'username': self.kwargs.get(self.username_url_kwarg)}
         )
+
+
+class DeletionStatus(LoginRequiredMixin, View):
+    """Ход удаления, запущенного автором или администратором."""
+
+    def get(self, request, job_id):
+        progress = get_progress(job_id)
+        if progress is None or not (
+            request.user.is_staff or progress['owner'] == request.user.id
+        ):
+            raise Http404('Удаление не найдено.')
+        return JsonResponse(progress)
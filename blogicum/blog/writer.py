@@ -0,0 +1,85 @@
+import queue
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+
+class WriteUnavailable(Exception):
+    """Очередь записи переполнена или запись не дождалась своей очереди."""
+
+
+class SerializedWriter:
+    """Выполняет записи в базу данных по очереди в одном потоке."""
+
+    def __init__(self, max_queue=None):
+        self.max_queue = max_queue
+        self.queue = None
+        self.lock = threading.Lock()
+        self.worker = None
+
+    def ensure_worker(self):
+        with self.lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.queue = queue.Queue(
+                    self.max_queue or settings.DB_WRITE_QUEUE_SIZE
+                )
+                self.worker = threading.Thread(
+                    target=self.run, name='db-writer', daemon=True
+                )
+                self.worker.start()
+
+    def run(self):
+        while True:
+            future, func, args, kwargs = self.queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                with transaction.atomic():
+                    result = func(*args, **kwargs)
+            except BaseException as error:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+            finally:
+                close_old_connections()
+
+    def submit(self, func, *args, **kwargs):
+        self.ensure_worker()
+        future = Future()
+        try:
+            self.queue.put(
+                (future, func, args, kwargs),
+                timeout=settings.DB_WRITE_QUEUE_TIMEOUT,
+            )
+        except queue.Full:
+            raise WriteUnavailable('Очередь записи переполнена.')
+        return future
+
+    def execute(self, func, *args, **kwargs):
+        if threading.current_thread() is self.worker:
+            return func(*args, **kwargs)
+        future = self.submit(func, *args, **kwargs)
+        try:
+            return future.result(timeout=settings.DB_WRITE_TIMEOUT)
+        except FutureTimeoutError:
+            # Если запись ещё не началась, отменяем её, чтобы клиент,
+            # получивший ошибку, не обнаружил потом свои данные в базе.
+            if future.cancel():
+                raise WriteUnavailable('Запись не дождалась очереди.')
+            return future.result()
+
+    def queue_depth(self):
+        return self.queue.qsize() if self.queue is not None else 0
+
+
+db_writer = SerializedWriter()
+
+
+def run_write(func, *args, **kwargs):
+    if not settings.DB_WRITE_SERIALIZED:
+        with transaction.atomic():
+            return func(*args, **kwargs)
+    return db_writer.execute(func, *args, **kwargs)
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 
@@ -38,6 +39,9 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'blog.middleware.ScheduledPublicationMiddleware',
+    'blog.middleware.WriteUnavailableMiddleware',
+    'blog.middleware.PrimaryStickinessMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
@@ -63,12 +67,98 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'blogicum.wsgi.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE=postgresql переключает проект на PostgreSQL (нужен пакет
+# psycopg2-binary). Соединения берутся из пула внутри процесса: не больше
+# DB_POOL_SIZE на процесс, каждое живёт не дольше DB_POOL_MAX_LIFETIME
+# секунд и проверяется запросом SELECT 1 после простоя.
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite3')
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'blog.backends.postgresql_pool',
+            'NAME': os.getenv('POSTGRES_DB', 'blogicum'),
+            'USER': os.getenv('POSTGRES_USER', 'blogicum'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', 'localhost'),
+            'PORT': os.getenv('DB_PORT', '5432'),
+            'OPTIONS': {
+                'pool': {
+                    'max_size': int(os.getenv('DB_POOL_SIZE', 10)),
+                    'max_lifetime': int(
+                        os.getenv('DB_POOL_MAX_LIFETIME', 30 * 60)
+                    ),
+                    'timeout': int(os.getenv('DB_POOL_TIMEOUT', 5)),
+                    'check_after': int(os.getenv('DB_POOL_CHECK_AFTER', 30)),
+                },
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
     }
+
+# Профиль базы данных: DB_PROFILE=production включает для SQLite журнал WAL
+# (читатели не ждут писателя), synchronous=NORMAL, отображение файла в
+# память, увеличенный кеш страниц и ожидание блокировки вместо ошибки
+# «database is locked». Соединения переиспользуются между запросами.
+DB_PROFILE = os.getenv('DB_PROFILE', 'default')
+SQLITE_PRODUCTION_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'busy_timeout': 20_000,
+    'temp_store': 'MEMORY',
 }
+SQLITE_PRODUCTION_CONN_MAX_AGE = 600
+SQLITE_PRAGMAS = {}
+if DB_PROFILE == 'production' and DB_ENGINE == 'sqlite3':
+    DATABASES['default']['CONN_MAX_AGE'] = SQLITE_PRODUCTION_CONN_MAX_AGE
+    SQLITE_PRAGMAS = SQLITE_PRODUCTION_PRAGMAS
+
+# Реплики для чтения публичных страниц: DB_REPLICAS — пути к копиям файла
+# SQLite или хосты реплик PostgreSQL через запятую. Реплики наполняет
+# репликация (или копирование файла), миграции к ним не применяются.
+# После записи пользователь REPLICA_STICKY_SECONDS секунд читает с основной
+# базы, чтобы сразу увидеть свою публикацию или комментарий. Столько же
+# после изменения страницы её читают с основной базы все: реплика могла
+# ещё не получить запись.
+DATABASE_REPLICAS = []
+for number, replica in enumerate(filter(None, os.getenv(
+    'DB_REPLICAS', ''
+).split(','))):
+    alias = f'replica_{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME' if DB_ENGINE == 'sqlite3' else 'HOST': replica.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+# Шарды комментариев: COMMENT_SHARDS — пути к файлам SQLite или имена баз
+# PostgreSQL через запятую. Комментарий публикации хранится в шарде
+# COMMENT_SHARDS[post_id % len(COMMENT_SHARDS)]; при изменении списка
+# комментарии переносит команда rebalance_comments.
+COMMENT_SHARDS = []
+for number, shard in enumerate(filter(None, os.getenv(
+    'COMMENT_SHARDS', ''
+).split(','))):
+    alias = f'comments_{number}'
+    DATABASES[alias] = {**DATABASES['default'], 'NAME': shard.strip()}
+    COMMENT_SHARDS.append(alias)
+# Номер процесса в идентификаторах комментариев (0–1023). Каждый процесс,
+# который пишет в шарды, должен получить свой номер, иначе идентификаторы
+# его комментариев могут совпасть с чужими.
+COMMENT_ID_NODE = int(os.getenv('COMMENT_ID_NODE', 0))
+DATABASE_ROUTERS = [
+    'blog.routers.CommentShardRouter',
+    'blog.routers.ReplicaRouter',
+]
+REPLICA_STICKY_SECONDS = 10
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -119,3 +209,60 @@ LOGOUT_REDIRECT_URL = 'blog:index'
 LOGIN_REDIRECT_URL = '/'
 
 CSRF_FAILURE_VIEW = 'pages.views.csrf_failure'
+
+# Для нескольких процессов нужен общий бэкенд кеша (Redis, Memcached),
+# иначе сброс кешированных страниц и счётчиков не дойдёт до соседей.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+PAGE_CACHE_ENABLED = False
+PAGE_CACHE_TIMEOUT = 60 * 5
+POST_CARD_CACHE_TIMEOUT = 60 * 60
+COMMENT_LIST_CACHE_TIMEOUT = 60 * 60
+
+FEED_COUNT_CACHE_TIMEOUT = 60 * 15
+FEED_COUNT_APPROXIMATE_AFTER = 100_000
+
+# Отложенная запись комментариев пачками из фонового потока. Очередь живёт
+# в памяти процесса: при аварийной остановке ещё не записанные
+# комментарии пропадут. Неудачная запись пачки повторяется
+# COMMENT_BUFFER_RETRIES раз с растущей паузой; после этого пачка
+# отбрасывается и учитывается в метрике dropped_total.
+COMMENT_WRITE_BUFFER = False
+COMMENT_BUFFER_BATCH_SIZE = 100
+COMMENT_BUFFER_FLUSH_INTERVAL = 0.2
+COMMENT_BUFFER_RETRIES = 3
+
+# Публикации старше POST_ARCHIVE_AFTER_DAYS дней вместе с комментариями
+# переносит в архивные таблицы команда archive_posts, по
+# POST_ARCHIVE_BATCH_SIZE публикаций за транзакцию. Архив только для
+# чтения: страница публикации и профиль показывают его как обычно.
+# Профиль читает архив только за границей POST_ARCHIVE_AFTER_DAYS, поэтому
+# срок можно уменьшать, но не увеличивать без возврата публикаций из архива.
+POST_ARCHIVE_AFTER_DAYS = 365
+POST_ARCHIVE_BATCH_SIZE = 100
+
+# Удаление публикаций, пользователей, категорий и местоположений идёт
+# пачками по DELETION_BATCH_SIZE строк, каждая в своей транзакции. При
+# DELETION_BACKGROUND удаление выполняется в фоновом потоке процесса, а ход
+# хранится в кеше DELETION_PROGRESS_TIMEOUT секунд.
+DELETION_BATCH_SIZE = 500
+DELETION_BACKGROUND = False
+DELETION_PROGRESS_TIMEOUT = 60 * 60 * 24
+
+# Запись публикаций, комментариев и профилей через один поток-писатель:
+# SQLite допускает только одну пишущую транзакцию. Очередь общая для
+# процесса, поэтому при нескольких процессах нужен один процесс с потоками
+# (например, gunicorn --workers 1 --threads N). Через очередь идут также
+# выпуск отложенных публикаций, пачки буфера комментариев и пачки
+# удаления. Сессии и last_login пишутся в обход очереди, как и команды
+# manage.py (архивирование, перенос комментариев по шардам), которые
+# запускаются отдельным процессом.
+DB_WRITE_SERIALIZED = False
+DB_WRITE_QUEUE_SIZE = 100
+DB_WRITE_QUEUE_TIMEOUT = 1
+DB_WRITE_TIMEOUT = 5
+DB_WRITE_RETRY_AFTER = 1
@@ -0,0 +1,86 @@
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from blog.models import ArchivedComment, ArchivedPost, Comment, Post
+from blog.views import PAGINATION
+
+N_HOT = 6
+N_OLD = 6
+
+
+@pytest.fixture
+def profile_posts(mixer, user, published_category, settings):
+    settings.POST_ARCHIVE_AFTER_DAYS = 550
+    now = timezone.now()
+    return mixer.cycle(N_HOT + N_OLD).blend(
+        "blog.Post",
+        author=user,
+        category=published_category,
+        is_published=True,
+        pub_date=(now - timedelta(days=days * 100) for days in range(12)),
+    )
+
+
+@pytest.mark.django_db
+def test_old_posts_move_to_archive_and_stay_readable(
+    user_client, another_user_client, mixer, profile_posts
+):
+    old = profile_posts[-1]
+    mixer.blend(
+        "blog.Comment", post=old, author=old.author, text="Старый комментарий"
+    )
+    old.refresh_from_db()
+
+    call_command("archive_posts", batch_size=2, verbosity=0)
+
+    assert Post.objects.count() == N_HOT, (
+        "Убедитесь, что старые публикации удаляются из рабочей таблицы."
+    )
+    assert ArchivedPost.objects.count() == N_OLD
+    assert not Comment.objects.filter(post_id=old.id).exists()
+    archived = ArchivedPost.objects.get(id=old.id)
+    assert archived.comment_count == 1
+    assert ArchivedComment.objects.filter(post=archived).count() == 1
+
+    response = another_user_client.get(f"/posts/{old.id}/")
+    assert response.status_code == HTTPStatus.OK, (
+        "Убедитесь, что архивная публикация открывается по прежнему адресу."
+    )
+    content = response.content.decode("utf-8")
+    assert old.title in content and "Старый комментарий" in content
+    assert 'id="comment-form"' not in content, (
+        "Убедитесь, что к архивной публикации нельзя оставить комментарий."
+    )
+
+
+@pytest.mark.django_db
+def test_profile_pages_continue_into_archive(
+    user, user_client, client, profile_posts
+):
+    call_command("archive_posts", verbosity=0)
+    expected = [post.id for post in profile_posts]
+    for viewer in (user_client, client):
+        url = f"/profile/{user.username}/"
+        response = viewer.get(url)
+        seen = [post.id for post in response.context["page_obj"]]
+        assert len(seen) == PAGINATION
+        assert f'?after={response.context["page_obj"].next_cursor}' in (
+            response.content.decode("utf-8")
+        )
+        response = viewer.get(
+            url, {"after": response.context["page_obj"].next_cursor}
+        )
+        page = response.context["page_obj"]
+        seen += [post.id for post in page]
+        assert seen == expected, (
+            "Убедитесь, что лента профиля после рабочих публикаций продолжает"
+            " показывать архивные в порядке даты."
+        )
+        response = viewer.get(url, {"before": page.previous_cursor})
+        assert [
+            post.id for post in response.context["page_obj"]
+        ] == expected[:PAGINATION]
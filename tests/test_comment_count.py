@@ -0,0 +1,119 @@
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+
+@pytest.mark.django_db
+def test_comment_count_follows_add_and_delete(
+    user_client, user, post_with_published_location, CommentModel
+):
+    post = post_with_published_location
+    for i in range(2):
+        response = user_client.post(
+            f"/add_comment/{post.id}/", data={"text": f"Комментарий {i}"}
+        )
+        assert response.status_code == HTTPStatus.FOUND
+    post.refresh_from_db()
+    assert post.comment_count == 2, (
+        "Убедитесь, что при добавлении комментария увеличивается счётчик"
+        " комментариев публикации."
+    )
+
+    comment = CommentModel.objects.filter(post=post).first()
+    user_client.post(f"/posts/{post.id}/delete_comment/{comment.id}/")
+    post.refresh_from_db()
+    assert post.comment_count == 1, (
+        "Убедитесь, что при удалении комментария уменьшается счётчик"
+        " комментариев публикации."
+    )
+
+
+@pytest.mark.django_db
+def test_recount_comments_command(comment_to_a_post, PostModel):
+    post = comment_to_a_post.post
+    PostModel.objects.filter(pk=post.pk).update(comment_count=42)
+    call_command("recount_comments", stdout=StringIO())
+    post.refresh_from_db()
+    assert post.comment_count == 1, (
+        "Убедитесь, что команда `recount_comments` пересчитывает счётчики"
+        " комментариев."
+    )
+
+
+@pytest.mark.django_db
+def test_buffered_comments_are_flushed_in_batches(
+    user_client, post_with_published_location, CommentModel,
+    settings, monkeypatch
+):
+    from blog.buffering import comment_buffer
+
+    settings.COMMENT_WRITE_BUFFER = True
+    monkeypatch.setattr(comment_buffer, "ensure_worker", lambda: None)
+    post = post_with_published_location
+    user_client.post(f"/add_comment/{post.id}/", data={"text": "Первый"})
+    response = user_client.post(
+        f"/posts/{post.id}/comments/add/", data={"text": "Второй"}
+    )
+    assert response.status_code == HTTPStatus.ACCEPTED
+    assert "Второй" in response.content.decode("utf-8")
+    assert not CommentModel.objects.filter(post=post).exists(), (
+        "Убедитесь, что в режиме буферизации комментарии не записываются"
+        " в базу данных сразу."
+    )
+    assert comment_buffer.metrics()["queue_depth"] == 2
+
+    flushed_before = comment_buffer.metrics()["flushed_total"]
+    assert comment_buffer.flush() == 2
+    post.refresh_from_db()
+    assert CommentModel.objects.filter(post=post).count() == 2
+    assert post.comment_count == 2, (
+        "Убедитесь, что при записи пачки комментариев обновляется счётчик"
+        " комментариев публикации."
+    )
+    metrics = comment_buffer.metrics()
+    assert metrics["queue_depth"] == 0
+    assert metrics["flushed_total"] == flushed_before + 2
+
+
+@pytest.mark.django_db
+def test_buffered_batch_survives_transient_errors(
+    user_client, post_with_published_location, CommentModel,
+    settings, monkeypatch
+):
+    from django.db import OperationalError
+
+    from blog.buffering import comment_buffer
+
+    settings.COMMENT_WRITE_BUFFER = True
+    settings.COMMENT_BUFFER_FLUSH_INTERVAL = 0.001
+    monkeypatch.setattr(comment_buffer, "ensure_worker", lambda: None)
+    post = post_with_published_location
+    write_batch = comment_buffer.write_batch
+    failures = []
+
+    def locked_once(batch):
+        if not failures:
+            failures.append(batch)
+            raise OperationalError("database is locked")
+        return write_batch(batch)
+
+    monkeypatch.setattr(comment_buffer, "write_batch", locked_once)
+    user_client.post(f"/add_comment/{post.id}/", data={"text": "Повтор"})
+    assert comment_buffer.flush() == 1
+    assert CommentModel.objects.filter(post=post).count() == 1, (
+        "Убедитесь, что пачка комментариев записывается повторно после"
+        " временной ошибки базы данных."
+    )
+
+    def always_locked(batch):
+        raise OperationalError("database is locked")
+
+    monkeypatch.setattr(comment_buffer, "write_batch", always_locked)
+    dropped_before = comment_buffer.metrics()["dropped_total"]
+    user_client.post(f"/add_comment/{post.id}/", data={"text": "Потеря"})
+    assert comment_buffer.flush() == 0
+    assert comment_buffer.metrics()["dropped_total"] == dropped_before + 1, (
+        "Убедитесь, что потерянные комментарии учитываются в метриках."
+    )
@@ -0,0 +1,158 @@
+from http import HTTPStatus
+
+import pytest
+from bs4 import BeautifulSoup
+
+N_COMMENTS = 60
+
+
+@pytest.fixture
+def many_comments(mixer, post_with_published_location):
+    return mixer.cycle(N_COMMENTS).blend(
+        "blog.Comment", post=post_with_published_location
+    )
+
+
+def get_more_link(content):
+    soup = BeautifulSoup(content.decode("utf-8"), "html.parser")
+    return soup.find("a", class_="load-more-comments")
+
+
+@pytest.mark.django_db
+def test_comments_are_paginated(
+    client, post_with_published_location, many_comments
+):
+    post = post_with_published_location
+    response = client.get(f"/posts/{post.id}/")
+    first_page = list(response.context["comments"])
+    assert 0 < len(first_page) < N_COMMENTS, (
+        "Убедитесь, что на странице публикации комментарии выводятся"
+        " порциями."
+    )
+    link = get_more_link(response.content)
+    assert link, (
+        "Убедитесь, что под комментариями есть ссылка для загрузки"
+        " следующей порции."
+    )
+
+    seen = [comment.id for comment in first_page]
+    while link:
+        response = client.get(link["data-fragment-url"])
+        assert response.status_code == HTTPStatus.OK
+        seen += [comment.id for comment in response.context["comments"]]
+        link = get_more_link(response.content)
+    expected = [
+        comment.id for comment in sorted(
+            many_comments, key=lambda comment: (comment.created_at, comment.id)
+        )
+    ]
+    assert seen == expected, (
+        "Убедитесь, что порции комментариев идут по порядку создания и"
+        " вместе содержат все комментарии публикации."
+    )
+
+
+@pytest.mark.django_db
+def test_comment_fragment_respects_post_visibility(
+    client, unpublished_posts_with_published_locations
+):
+    post = unpublished_posts_with_published_locations[0]
+    response = client.get(f"/posts/{post.id}/comments/")
+    assert response.status_code == HTTPStatus.NOT_FOUND, (
+        "Убедитесь, что комментарии скрытой публикации недоступны"
+        " посторонним."
+    )
+
+
+@pytest.mark.django_db
+def test_comment_list_fragment_is_cached_per_post(
+    user, user_client, another_user_client, mixer,
+    post_with_published_location
+):
+    post = post_with_published_location
+    comment = mixer.blend("blog.Comment", post=post, author=user)
+    url = f"/posts/{post.id}/comments/"
+    edit_url = f"/posts/{post.id}/edit_comment/{comment.id}/"
+
+    response = user_client.get(url)
+    assert edit_url in response.content.decode("utf-8"), (
+        "Убедитесь, что автор комментария видит кнопки редактирования."
+    )
+    response = another_user_client.get(url)
+    assert f'name="comment_{comment.id}"' in response.content.decode("utf-8")
+    assert edit_url not in response.content.decode("utf-8"), (
+        "Убедитесь, что закешированный список комментариев не показывает"
+        " чужим пользователям кнопки редактирования."
+    )
+
+    comment.text = "Исправленный текст комментария"
+    comment.save()
+    response = another_user_client.get(url)
+    assert comment.text in response.content.decode("utf-8"), (
+        "Убедитесь, что кеш списка комментариев сбрасывается при изменении"
+        " комментария."
+    )
+
+    user.username = "renamed_author"
+    user.save()
+    response = another_user_client.get(url)
+    assert "@renamed_author" in response.content.decode("utf-8"), (
+        "Убедитесь, что кеш списка комментариев сбрасывается при смене"
+        " имени автора."
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("action", ["edit_comment", "delete_comment"])
+def test_comment_lookup_is_scoped_by_post(
+    user, user_client, mixer, post_with_published_location, action
+):
+    comment = mixer.blend(
+        "blog.Comment", post=post_with_published_location, author=user
+    )
+    other_post = mixer.blend("blog.Post", author=user)
+    response = user_client.get(f"/posts/{other_post.id}/{action}/{comment.id}/")
+    assert response.status_code == HTTPStatus.NOT_FOUND, (
+        "Убедитесь, что комментарий ищется в пределах публикации из адреса"
+        " и при несовпадении возвращается ошибка 404."
+    )
+
+
+@pytest.mark.django_db
+def test_add_comment_fragment_returns_only_new_comment(
+    user_client, post_with_published_location
+):
+    post = post_with_published_location
+    url = f"/posts/{post.id}/comments/add/"
+    response = user_client.post(url, data={"text": "Новый комментарий"})
+    assert response.status_code == HTTPStatus.CREATED, (
+        "Убедитесь, что отдельный адрес добавления комментария отвечает"
+        " статусом 201 без перенаправления."
+    )
+    comment = post.comment.get()
+    content = response.content.decode("utf-8")
+    assert "Новый комментарий" in content
+    assert f"/posts/{post.id}/edit_comment/{comment.id}/" in content, (
+        "Убедитесь, что фрагмент нового комментария содержит кнопки автора."
+    )
+    assert "<html" not in content, (
+        "Убедитесь, что в ответ возвращается только фрагмент комментария."
+    )
+
+    response = user_client.post(
+        url, data={"text": "Ещё один"}, HTTP_ACCEPT="application/json"
+    )
+    assert response.status_code == HTTPStatus.CREATED
+    assert "Ещё один" in response.json()["html"]
+
+    response = user_client.post(
+        url, data={"text": ""}, HTTP_ACCEPT="application/json"
+    )
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert "text" in response.json()["errors"]
+
+    response = user_client.post(
+        f"/posts/{post.id + 100}/comments/add/", data={"text": "Текст"}
+    )
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert post.comment.count() == 2
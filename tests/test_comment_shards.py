@@ -0,0 +1,169 @@
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connections
+
+from blog.models import Comment
+from blog.sharding import (NODE_BITS, SEQUENCE_BITS, next_comment_id,
+                           shard_for)
+
+SHARDS = ["comments_0", "comments_1"]
+
+
+@pytest.fixture
+def comment_shards(settings, tmp_path):
+    for alias in SHARDS:
+        connections.databases[alias] = {
+            **connections.databases["default"],
+            "NAME": str(tmp_path / f"{alias}.sqlite3"),
+        }
+    settings.COMMENT_SHARDS = SHARDS
+    for alias in SHARDS:
+        call_command("migrate", database=alias, verbosity=0)
+    yield SHARDS
+    for alias in SHARDS:
+        connections[alias].close()
+        del connections[alias]
+        del connections.databases[alias]
+
+
+def stored_in(comment_id):
+    return [
+        alias for alias in ["default", *SHARDS]
+        if Comment.objects.using(alias).filter(id=comment_id).exists()
+    ]
+
+
+@pytest.mark.django_db
+def test_comment_lifecycle_in_shard(
+    user_client, post_with_published_location, comment_shards
+):
+    post = post_with_published_location
+    user_client.post(f"/add_comment/{post.id}/", data={"text": "В шарде"})
+    comment = Comment.objects.using(shard_for(post.id)).get(post_id=post.id)
+    assert stored_in(comment.id) == [shard_for(post.id)], (
+        "Убедитесь, что комментарий сохраняется только в шарде своей"
+        " публикации."
+    )
+    post.refresh_from_db()
+    assert post.comment_count == 1
+
+    response = user_client.get(f"/posts/{post.id}/")
+    assert "В шарде" in response.content.decode("utf-8"), (
+        "Убедитесь, что страница публикации показывает комментарии из шарда."
+    )
+
+    user_client.post(
+        f"/posts/{post.id}/edit_comment/{comment.id}/",
+        data={"text": "Исправлено"},
+    )
+    comment.refresh_from_db()
+    assert comment.text == "Исправлено"
+
+    response = user_client.post(
+        f"/posts/{post.id}/delete_comment/{comment.id}/"
+    )
+    assert response.status_code == HTTPStatus.FOUND
+    assert stored_in(comment.id) == []
+    post.refresh_from_db()
+    assert post.comment_count == 0
+
+
+@pytest.mark.django_db
+def test_rebalance_moves_comments_into_shards(
+    mixer, post_with_published_location, comment_shards
+):
+    post = post_with_published_location
+    legacy = Comment(
+        id=1, text="До шардирования", post=post, author=post.author
+    )
+    legacy.save(using="default")
+    misplaced = Comment(text="Не в своём шарде", post=post, author=post.author)
+    misplaced.save(using=SHARDS[(post.id + 1) % len(SHARDS)])
+
+    call_command("rebalance_comments", batch_size=1, verbosity=0)
+
+    for comment in (legacy, misplaced):
+        assert stored_in(comment.id) == [shard_for(post.id)], (
+            "Убедитесь, что rebalance_comments переносит комментарии в шард"
+            " их публикации."
+        )
+
+
+@pytest.mark.django_db
+def test_rebalance_keeps_comments_with_taken_ids(
+    another_user, post_with_published_location, comment_shards
+):
+    post = post_with_published_location
+    legacy = Comment(
+        id=7, text="До шардирования", post=post, author=post.author
+    )
+    legacy.save(using="default")
+    Comment(
+        id=7, text="Чужой", post=post, author=another_user
+    ).save(using=shard_for(post.id))
+
+    call_command("rebalance_comments", verbosity=0, stderr=StringIO())
+
+    assert Comment.objects.using("default").filter(id=7).exists(), (
+        "Убедитесь, что rebalance_comments не удаляет комментарий, который"
+        " не удалось записать в шард."
+    )
+
+
+def test_comment_ids_carry_configured_node(settings):
+    settings.COMMENT_ID_NODE = 5
+    comment_id = next_comment_id()
+    assert comment_id >> SEQUENCE_BITS & (1 << NODE_BITS) - 1 == 5, (
+        "Убедитесь, что номер процесса в идентификаторе комментария берётся"
+        " из настройки COMMENT_ID_NODE."
+    )
+    settings.COMMENT_ID_NODE = 1 << NODE_BITS
+    with pytest.raises(ImproperlyConfigured):
+        next_comment_id()
+
+
+@pytest.mark.django_db
+def test_buffer_retry_does_not_duplicate_comments(
+    settings, monkeypatch, mixer, user, user_client, published_category,
+    comment_shards
+):
+    from django.db import OperationalError
+    from django.db.models import QuerySet
+
+    from blog.buffering import comment_buffer
+
+    settings.COMMENT_WRITE_BUFFER = True
+    settings.COMMENT_BUFFER_FLUSH_INTERVAL = 0.001
+    monkeypatch.setattr(comment_buffer, "ensure_worker", lambda: None)
+    posts = mixer.cycle(2).blend(
+        "blog.Post", author=user, category=published_category
+    )
+    bulk_create = QuerySet.bulk_create
+    # Падает второй шард пачки, когда первый уже зафиксировал запись.
+    last_shard = shard_for(posts[-1].id)
+    failed = []
+
+    def locked_once(self, *args, **kwargs):
+        if self.db == last_shard and not failed:
+            failed.append(self.db)
+            raise OperationalError("database is locked")
+        return bulk_create(self, *args, **kwargs)
+
+    monkeypatch.setattr(QuerySet, "bulk_create", locked_once)
+    for post in posts:
+        user_client.post(f"/add_comment/{post.id}/", data={"text": "Пачка"})
+    assert comment_buffer.flush() == 2
+    assert failed
+    for post in posts:
+        post.refresh_from_db()
+        stored = Comment.objects.using(shard_for(post.id)).filter(
+            post_id=post.id
+        ).count()
+        assert stored == post.comment_count == 1, (
+            "Убедитесь, что повтор пачки не записывает комментарии в шард"
+            " второй раз."
+        )
@@ -0,0 +1,121 @@
+from http import HTTPStatus
+
+import pytest
+from django.conf import settings
+from django.db import connection
+from django.middleware.csrf import _get_new_csrf_token
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+
+def revalidate(client, url, response):
+    return client.get(
+        url,
+        HTTP_IF_NONE_MATCH=response["ETag"],
+        HTTP_IF_MODIFIED_SINCE=response["Last-Modified"],
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "url_template",
+    [
+        "/",
+        "/category/{category.slug}/",
+        "/profile/{user.username}/",
+        "/posts/{post.id}/",
+    ],
+)
+def test_unchanged_page_is_not_rendered_again(
+    user_client, user, published_category, post_with_published_location,
+    url_template
+):
+    url = url_template.format(
+        category=published_category, user=user,
+        post=post_with_published_location,
+    )
+    response = user_client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    assert response.has_header("ETag") and response.has_header(
+        "Last-Modified"
+    ), (
+        f"Убедитесь, что страница `{url}` отдаёт заголовки ETag и"
+        " Last-Modified."
+    )
+
+    with CaptureQueriesContext(connection) as queries:
+        response = revalidate(user_client, url, response)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+        f"Убедитесь, что неизменившаяся страница `{url}` отвечает статусом"
+        " 304."
+    )
+    assert not any(
+        "blog_post" in query["sql"] for query in queries.captured_queries
+    ), "Убедитесь, что для ответа 304 публикации не загружаются из базы."
+
+
+@pytest.mark.django_db
+def test_changes_invalidate_validators(
+    user_client, user, another_user_client, mixer,
+    post_with_published_location
+):
+    post = post_with_published_location
+    url = f"/posts/{post.id}/"
+    response = user_client.get(url)
+    mixer.blend("blog.Comment", post=post)
+    assert revalidate(user_client, url, response).status_code == (
+        HTTPStatus.OK
+    ), "Убедитесь, что после нового комментария страница отдаётся заново."
+
+    response = another_user_client.get("/")
+    post.title = "Новый заголовок"
+    post.save()
+    assert revalidate(another_user_client, "/", response).status_code == (
+        HTTPStatus.OK
+    ), "Убедитесь, что после изменения публикации лента отдаётся заново."
+
+    response = user_client.get(url)
+    assert revalidate(another_user_client, url, response).status_code == (
+        HTTPStatus.OK
+    ), "Убедитесь, что валидатор страницы зависит от пользователя."
+
+
+@pytest.mark.django_db
+def test_new_csrf_token_invalidates_validators(
+    user_client, post_with_published_location
+):
+    url = f"/posts/{post_with_published_location.id}/"
+    response = user_client.get(url)
+    assert settings.CSRF_COOKIE_NAME in user_client.cookies
+    # Вход в систему выдаёт новый CSRF-токен.
+    user_client.cookies[settings.CSRF_COOKIE_NAME] = _get_new_csrf_token()
+    assert revalidate(user_client, url, response).status_code == (
+        HTTPStatus.OK
+    ), "Убедитесь, что после смены CSRF-токена страница отдаётся заново."
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "url_template",
+    [
+        "/",
+        "/category/{post.category.slug}/",
+        "/profile/{post.author.username}/",
+        "/posts/{post.id}/",
+    ],
+)
+def test_pages_work_without_cache(
+    user_client, client, post_with_published_location, url_template
+):
+    url = url_template.format(post=post_with_published_location)
+    dummy = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.dummy.DummyCache"
+        }
+    }
+    with override_settings(CACHES=dummy, PAGE_CACHE_ENABLED=True):
+        for viewer in (user_client, client):
+            assert viewer.get(url).status_code == HTTPStatus.OK, (
+                f"Убедитесь, что страница `{url}` открывается при"
+                " отключённом кеше."
+            )
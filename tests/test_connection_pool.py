@@ -0,0 +1,57 @@
+import itertools
+
+import pytest
+
+from blog.backends.pool import ConnectionPool, PoolExhausted
+
+
+class FakeConnection:
+    numbers = itertools.count()
+
+    def __init__(self):
+        self.number = next(self.numbers)
+        self.alive = True
+        self.closed = False
+
+
+def make_pool(**kwargs):
+    return ConnectionPool(
+        connect=FakeConnection,
+        ping=lambda connection: connection.alive,
+        reset=lambda connection: connection.alive,
+        close=lambda connection: setattr(connection, "closed", True),
+        **kwargs,
+    )
+
+
+def test_pool_reuses_connections():
+    pool = make_pool(max_size=2)
+    connection = pool.get()
+    pool.put(connection)
+    assert pool.get() is connection, (
+        "Убедитесь, что возвращённое в пул соединение выдаётся повторно."
+    )
+
+
+def test_pool_size_is_bounded():
+    pool = make_pool(max_size=1, timeout=0.01)
+    pool.get()
+    with pytest.raises(PoolExhausted):
+        pool.get()
+
+
+def test_pool_drops_dead_and_expired_connections():
+    pool = make_pool(max_size=2, check_after=0)
+    dead = pool.get()
+    pool.put(dead)
+    dead.alive = False
+    fresh = pool.get()
+    assert fresh is not dead and dead.closed, (
+        "Убедитесь, что соединение, не прошедшее проверку, закрывается."
+    )
+    pool.put(fresh)
+
+    pool.max_lifetime = 0
+    assert pool.get() is not fresh and fresh.closed, (
+        "Убедитесь, что соединение старше max_lifetime не выдаётся."
+    )
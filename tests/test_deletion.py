@@ -0,0 +1,150 @@
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from blog import admin as blog_admin
+from blog import views
+from blog.deletion import get_progress, start_deletion
+from blog.models import ArchivedComment, ArchivedPost, Comment, Post
+
+BATCH_SIZE = 2
+
+
+@pytest.fixture
+def small_batches(settings):
+    settings.DELETION_BATCH_SIZE = BATCH_SIZE
+    settings.POST_ARCHIVE_AFTER_DAYS = 100
+
+
+@pytest.fixture
+def authored(mixer, user, another_user, published_category, small_batches):
+    posts = mixer.cycle(3).blend(
+        "blog.Post", author=user, category=published_category,
+        pub_date=timezone.now() - timedelta(days=1),
+    )
+    old_post = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        pub_date=timezone.now() - timedelta(days=200),
+    )
+    foreign_post = mixer.blend(
+        "blog.Post", author=another_user, category=published_category,
+        pub_date=timezone.now() - timedelta(days=1),
+    )
+    for post in (*posts, old_post):
+        mixer.cycle(3).blend("blog.Comment", post=post, author=another_user)
+    mixer.cycle(3).blend("blog.Comment", post=foreign_post, author=user)
+    call_command("archive_posts", verbosity=0)
+    return posts, foreign_post
+
+
+@pytest.mark.django_db
+def test_user_is_deleted_in_batches(user, another_user, authored):
+    posts, foreign_post = authored
+    with CaptureQueriesContext(connection) as queries:
+        progress = start_deletion(user)
+    comment_deletes = [
+        query["sql"] for query in queries.captured_queries
+        if query["sql"].startswith('DELETE FROM "blog_comment"')
+    ]
+    assert len(comment_deletes) > 1 and all(
+        sql.count(",") < BATCH_SIZE for sql in comment_deletes
+    ), "Убедитесь, что комментарии удаляются пачками, а не одним запросом."
+    User = get_user_model()
+    assert not User.objects.filter(pk=user.pk).exists()
+    assert not Post.objects.filter(author=user).exists()
+    assert not ArchivedPost.objects.filter(author_id=user.pk).exists()
+    assert not Comment.objects.filter(author_id=user.pk).exists()
+    assert not Comment.objects.filter(
+        post_id__in=[post.id for post in posts]
+    ).exists()
+    assert not ArchivedComment.objects.exists()
+    foreign_post.refresh_from_db()
+    assert foreign_post.comment_count == 0, (
+        "Убедитесь, что счётчики комментариев чужих публикаций уменьшаются."
+    )
+    assert get_progress(progress.job_id)["state"] == "done"
+    assert progress.done == progress.total
+
+
+@pytest.mark.django_db
+def test_category_deletion_detaches_posts(
+    mixer, user, published_category, small_batches
+):
+    mixer.cycle(5).blend(
+        "blog.Post", author=user, category=published_category
+    )
+    start_deletion(published_category)
+    assert Post.objects.filter(category__isnull=True).count() == 5
+    assert not Post.objects.filter(is_visible=True).exists(), (
+        "Убедитесь, что публикации без категории пропадают из ленты."
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_post_deleted_in_background(
+    settings, monkeypatch, mixer, user, user_client, another_user_client,
+    published_category, small_batches
+):
+    settings.DELETION_BACKGROUND = True
+    post = mixer.blend("blog.Post", author=user, category=published_category)
+    mixer.cycle(5).blend("blog.Comment", post=post, author=user)
+    started = []
+
+    def remember(obj, **kwargs):
+        started.append(start_deletion(obj, **kwargs))
+        return started[-1]
+
+    monkeypatch.setattr(views, "start_deletion", remember)
+    response = user_client.post(f"/posts/{post.id}/delete/")
+    progress = started[0]
+    url = f"/deletions/{progress.job_id}/"
+    assert response.status_code == HTTPStatus.FOUND
+    assert response["Location"] == url, (
+        "Убедитесь, что после запуска фонового удаления автор попадает на"
+        " страницу его хода."
+    )
+    progress.thread.join(timeout=10)
+    assert not Post.objects.filter(pk=post.id).exists()
+    assert not Comment.objects.filter(post_id=post.id).exists()
+
+    assert user_client.get(url).json()["state"] == "done"
+    assert another_user_client.get(url).status_code == HTTPStatus.NOT_FOUND, (
+        "Убедитесь, что ход удаления виден только его автору."
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_admin_deletes_without_outer_transaction(
+    monkeypatch, client, django_user_model, mixer, user, published_category,
+    small_batches
+):
+    admin_user = django_user_model.objects.create_superuser(
+        "root", "root@example.com", "password"
+    )
+    client.force_login(admin_user)
+    mixer.cycle(3).blend("blog.Post", author=user, category=published_category)
+    in_atomic = []
+
+    def remember(obj, **kwargs):
+        in_atomic.append(connection.in_atomic_block)
+        return start_deletion(obj, **kwargs)
+
+    monkeypatch.setattr(blog_admin, "start_deletion", remember)
+    response = client.get(f"/admin/auth/user/{user.pk}/delete/")
+    assert "Публикации пользователя" in response.content.decode("utf-8")
+    response = client.post(
+        f"/admin/auth/user/{user.pk}/delete/", {"post": "yes"}
+    )
+    assert response.status_code == HTTPStatus.FOUND
+    assert in_atomic == [False], (
+        "Убедитесь, что удаление из админки не выполняется внутри одной"
+        " общей транзакции."
+    )
+    assert not django_user_model.objects.filter(pk=user.pk).exists()
+    assert not Post.objects.filter(author_id=user.pk).exists()
@@ -0,0 +1,118 @@
+from http import HTTPStatus
+
+import pytest
+from django.test import override_settings
+
+CACHE_HEADER = "X-Cache"
+
+
+@pytest.fixture(autouse=True)
+def enable_page_cache():
+    with override_settings(PAGE_CACHE_ENABLED=True):
+        yield
+
+
+def get_urls(post):
+    return (
+        "/",
+        f"/category/{post.category.slug}/",
+        f"/posts/{post.id}/",
+    )
+
+
+@pytest.mark.django_db
+def test_anonymous_pages_are_cached(client, post_with_published_location):
+    for url in get_urls(post_with_published_location):
+        first = client.get(url)
+        second = client.get(url)
+        assert first.status_code == second.status_code == HTTPStatus.OK
+        assert (first[CACHE_HEADER], second[CACHE_HEADER]) == (
+            "MISS", "HIT"
+        ), (
+            f"Убедитесь, что страница `{url}` для анонимного пользователя"
+            " отдаётся из кеша при повторном запросе."
+        )
+        assert first.content == second.content
+
+
+@pytest.mark.django_db
+def test_authenticated_pages_are_not_cached(
+    user_client, post_with_published_location
+):
+    for url in get_urls(post_with_published_location):
+        user_client.get(url)
+        assert not user_client.get(url).has_header(CACHE_HEADER), (
+            f"Убедитесь, что страница `{url}` не кешируется для"
+            " авторизованного пользователя."
+        )
+
+
+@pytest.mark.django_db
+def test_pages_invalidated_by_comment(
+    client, user_client, post_with_published_location
+):
+    post = post_with_published_location
+    for url in get_urls(post):
+        client.get(url)
+    user_client.post(
+        f"/add_comment/{post.id}/", data={"text": "Новый комментарий"}
+    )
+    for url in get_urls(post):
+        response = client.get(url)
+        assert response[CACHE_HEADER] == "MISS", (
+            f"Убедитесь, что кеш страницы `{url}` сбрасывается после"
+            " добавления комментария."
+        )
+    assert "Новый комментарий" in response.content.decode("utf-8")
+
+
+@pytest.mark.django_db
+def test_pages_invalidated_by_category_change(
+    client, post_with_published_location
+):
+    post = post_with_published_location
+    url = f"/posts/{post.id}/"
+    client.get(url)
+    post.category.is_published = False
+    post.category.save()
+    assert client.get(url).status_code == HTTPStatus.NOT_FOUND, (
+        "Убедитесь, что кеш страницы публикации сбрасывается при снятии"
+        " категории с публикации."
+    )
+
+
+@pytest.mark.django_db
+def test_post_card_follows_post_and_author_changes(
+    user_client, user, post_with_published_location
+):
+    post = post_with_published_location
+    user_client.get("/")
+    post.title = "Обновлённый заголовок"
+    post.save()
+    user.username = "renamed_author"
+    user.save()
+    content = user_client.get("/").content.decode("utf-8")
+    assert "Обновлённый заголовок" in content, (
+        "Убедитесь, что кешированная карточка публикации обновляется после"
+        " редактирования публикации."
+    )
+    assert "@renamed_author" in content, (
+        "Убедитесь, что кешированная карточка публикации обновляется после"
+        " смены имени автора."
+    )
+
+
+@pytest.mark.django_db
+def test_category_page_invalidated_by_author_rename(
+    client, user, post_with_published_location
+):
+    url = f"/category/{post_with_published_location.category.slug}/"
+    client.get(url)
+    user.username = "renamed_author"
+    user.save()
+    response = client.get(url)
+    assert response[CACHE_HEADER] == "MISS", (
+        "Убедитесь, что кеш страницы категории сбрасывается после смены"
+        " имени автора её публикаций."
+    )
+    assert "@renamed_author" in response.content.decode("utf-8")
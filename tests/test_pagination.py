@@ -0,0 +1,135 @@
+import base64
+import json
+from http import HTTPStatus
+
+import pytest
+from bs4 import BeautifulSoup
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from conftest import N_PER_PAGE
+
+
+def get_cursor_link(response, param):
+    soup = BeautifulSoup(response.content.decode("utf-8"), "html.parser")
+    for link in soup.find_all("a", class_="page-link"):
+        href = link.get("href", "")
+        if href.startswith(f"?{param}="):
+            return href
+    return None
+
+
+def walk_feed(client, url):
+    ids = []
+    response = client.get(url)
+    while True:
+        assert response.status_code == HTTPStatus.OK, (
+            f"Убедитесь, что страница `{url}` с курсором загружается без"
+            " ошибок."
+        )
+        ids.extend(post.id for post in response.context["page_obj"])
+        next_link = get_cursor_link(response, "after")
+        if not next_link:
+            return ids, response
+        response = client.get(url + next_link)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "url_template",
+    ["/", "/category/{category.slug}/", "/profile/{user.username}/"],
+)
+def test_keyset_pagination_walks_whole_feed(
+    user_client, user, published_category,
+    many_posts_with_published_locations, url_template
+):
+    url = url_template.format(category=published_category, user=user)
+    posts = many_posts_with_published_locations
+    expected = [
+        post.id for post in sorted(
+            posts, key=lambda post: (post.pub_date, post.id), reverse=True
+        )
+    ]
+    ids, last_response = walk_feed(user_client, url)
+    assert ids == expected, (
+        "Убедитесь, что переход по ссылкам `?after=` проходит все публикации"
+        " ленты по одному разу, «от новых к старым»."
+    )
+
+    previous_link = get_cursor_link(last_response, "before")
+    assert previous_link, (
+        "Убедитесь, что на последней странице ленты есть ссылка `?before=`."
+    )
+    last_page_start = len(expected) - len(last_response.context["page_obj"])
+    response = user_client.get(url + previous_link)
+    assert [post.id for post in response.context["page_obj"]] == (
+        expected[last_page_start - N_PER_PAGE:last_page_start]
+    ), "Убедитесь, что ссылка `?before=` ведёт на предыдущую страницу."
+
+
+@pytest.mark.django_db
+def test_page_number_links_still_work(
+    user_client, many_posts_with_published_locations
+):
+    response = user_client.get("/?page=2")
+    assert response.status_code == HTTPStatus.OK
+    page_obj = response.context["page_obj"]
+    assert page_obj.number == 2, (
+        "Убедитесь, что старые ссылки вида `?page=N` продолжают работать."
+    )
+    assert len(page_obj) == N_PER_PAGE
+
+
+@pytest.mark.django_db
+def test_invalid_cursor_returns_404(user_client):
+    response = user_client.get("/?after=not-a-cursor")
+    assert response.status_code == HTTPStatus.NOT_FOUND, (
+        "Убедитесь, что некорректный курсор страницы приводит к ошибке 404."
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url", [
+    "/?after={cursor}",
+    "/?before={cursor}",
+    "/posts/{post_id}/comments/?after={cursor}",
+])
+@pytest.mark.parametrize("values", [
+    [None, None],
+    ["2020-01-01T00:00:00+00:00", "99999999999999999999999"],
+])
+def test_cursor_with_nulls_returns_404(
+    user_client, post_with_published_location, url, values
+):
+    cursor = base64.urlsafe_b64encode(
+        json.dumps(values).encode()
+    ).decode().rstrip("=")
+    url = url.format(cursor=cursor, post_id=post_with_published_location.id)
+    response = user_client.get(url)
+    assert response.status_code == HTTPStatus.NOT_FOUND, (
+        f"Убедитесь, что курсор {values} на странице `{url}` приводит к"
+        " ошибке 404."
+    )
+
+
+@pytest.mark.django_db
+def test_page_count_is_cached_and_invalidated(
+    user_client, mixer, user, published_category,
+    many_posts_with_published_locations
+):
+    user_client.get("/?page=1")
+    with CaptureQueriesContext(connection) as queries:
+        response = user_client.get("/?page=1")
+    assert not any(
+        "COUNT(" in query["sql"] for query in queries.captured_queries
+    ), "Убедитесь, что число публикаций ленты берётся из кеша."
+    num_pages = response.context["page_obj"].paginator.num_pages
+
+    mixer.cycle(N_PER_PAGE).blend(
+        "blog.Post", author=user, category=published_category
+    )
+    response = user_client.get("/?page=1")
+    assert response.context["page_obj"].paginator.num_pages == num_pages + 1, (
+        "Убедитесь, что кешированное число публикаций сбрасывается при"
+        " создании публикации."
+    )
@@ -0,0 +1,53 @@
+import pytest
+
+
+@pytest.mark.django_db
+def test_published_queryset(
+    PostModel, post_with_published_location, future_posts,
+    unpublished_posts_with_published_locations,
+    posts_with_unpublished_category,
+):
+    assert list(PostModel.objects.published()) == [
+        post_with_published_location
+    ], (
+        "Убедитесь, что `Post.objects.published()` возвращает только"
+        " опубликованные посты опубликованных категорий с наступившей датой."
+    )
+
+
+@pytest.mark.django_db
+def test_profile_hides_unpublished_from_other_users(
+    user, user_client, another_user_client, post_with_published_location,
+    future_posts, unpublished_posts_with_published_locations,
+):
+    url = f"/profile/{user.username}/"
+    own = user_client.get(url).context["page_obj"]
+    public = another_user_client.get(url).context["page_obj"]
+    assert len(own) > 1
+    assert list(public) == [post_with_published_location], (
+        "Убедитесь, что другие пользователи видят на странице автора только"
+        " его опубликованные посты."
+    )
+
+
+@pytest.mark.django_db
+def test_visibility_follows_category(post_with_published_location):
+    post = post_with_published_location
+    category = post.category
+    assert post.is_visible
+
+    category.is_published = False
+    category.save()
+    post.refresh_from_db()
+    assert not post.is_visible, (
+        "Убедитесь, что при снятии категории с публикации её посты"
+        " перестают быть видимыми."
+    )
+
+    category.is_published = True
+    category.save()
+    post.refresh_from_db()
+    assert post.is_visible, (
+        "Убедитесь, что при возврате категории в публикацию её посты"
+        " снова становятся видимыми."
+    )
@@ -0,0 +1,96 @@
+from http import HTTPStatus
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from mixer.backend.django import Mixer
+
+from blog.scheduling import release_if_due
+from conftest import N_PER_PAGE
+
+# Количество SQL-запросов на одну страницу не должно зависеть от числа
+# публикаций и комментариев на ней. Бюджеты указаны для авторизованного
+# пользователя: два запроса уходят на сессию и пользователя.
+QUERY_BUDGETS = {
+    "index": 3,
+    "category": 4,
+    "profile": 4,
+    "post_detail": 4,
+    "own_hidden_post_detail": 4,
+    "post_edit": 5,
+    "post_delete": 3,
+    "comment_edit": 3,
+    "comment_delete": 3,
+}
+
+
+def blend_many(mixer: Mixer, model, n=N_PER_PAGE, **kwargs):
+    return (mixer.blend(model, **kwargs) for _ in range(n))
+
+
+@pytest.fixture
+def seeded_page(mixer: Mixer, user, published_category):
+    posts = mixer.cycle(N_PER_PAGE).blend(
+        "blog.Post",
+        author=blend_many(mixer, get_user_model()),
+        category=published_category,
+        location=blend_many(mixer, "blog.Location"),
+    )
+    own_posts = mixer.cycle(N_PER_PAGE).blend(
+        "blog.Post",
+        author=user,
+        category=blend_many(mixer, "blog.Category", is_published=True),
+        location=blend_many(mixer, "blog.Location"),
+    )
+    mixer.cycle(N_PER_PAGE).blend(
+        "blog.Comment",
+        post=posts[0],
+        author=blend_many(mixer, get_user_model()),
+    )
+    own_posts[0].is_published = False
+    own_posts[0].save()
+    mixer.blend("blog.Comment", post=own_posts[1], author=user)
+    return posts, own_posts
+
+
+def get_urls(seeded_page, user, category):
+    posts, own_posts = seeded_page
+    comment = own_posts[1].comment.get()
+    return {
+        "index": "/",
+        "category": f"/category/{category.slug}/",
+        "profile": f"/profile/{user.username}/",
+        "post_detail": f"/posts/{posts[0].id}/",
+        "own_hidden_post_detail": f"/posts/{own_posts[0].id}/",
+        "post_edit": f"/posts/{own_posts[1].id}/edit/",
+        "post_delete": f"/posts/{own_posts[1].id}/delete/",
+        "comment_edit": (
+            f"/posts/{own_posts[1].id}/edit_comment/{comment.id}/"
+        ),
+        "comment_delete": (
+            f"/posts/{own_posts[1].id}/delete_comment/{comment.id}/"
+        ),
+    }
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("view_name", QUERY_BUDGETS)
+def test_view_query_budget(
+    user_client, user, seeded_page, published_category, view_name
+):
+    url = get_urls(seeded_page, user, published_category)[view_name]
+    # Прогреваем только дату ближайшей отложенной публикации: кеши
+    # фрагментов и счётчиков остаются пустыми, и бюджет проверяется для
+    # холодной страницы.
+    release_if_due()
+    with CaptureQueriesContext(connection) as queries:
+        response = user_client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    budget = QUERY_BUDGETS[view_name]
+    executed = "\n".join(query["sql"] for query in queries.captured_queries)
+    assert len(queries) <= budget, (
+        f"Страница `{url}` выполнила {len(queries)} SQL-запросов при"
+        f" бюджете {budget}. Убедитесь, что связанные объекты загружаются"
+        f" одним запросом:\n{executed}"
+    )
@@ -0,0 +1,153 @@
+import sqlite3
+from contextlib import ExitStack, contextmanager
+from http import HTTPStatus
+
+import pytest
+from django.core.cache import cache
+from django.db import connections
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from blog import routers
+from blog.cache import TAG_KEY
+from blog.middleware import STICKY_COOKIE
+from blog.scheduling import release_if_due
+
+REPLICAS = ["replica_0", "replica_1"]
+
+
+@pytest.fixture
+def replicas(settings, tmp_path):
+    for alias in REPLICAS:
+        connections.databases[alias] = {
+            **connections.databases["default"],
+            "NAME": str(tmp_path / f"{alias}.sqlite3"),
+        }
+    settings.DATABASE_REPLICAS = REPLICAS
+
+    def sync():
+        # Реплики наполняются копией файла основной базы.
+        source = connections["default"]
+        source.ensure_connection()
+        for alias in REPLICAS:
+            connections[alias].close()
+            target = sqlite3.connect(connections.databases[alias]["NAME"])
+            source.connection.backup(target)
+            target.close()
+
+    yield sync
+    for alias in REPLICAS:
+        connections[alias].close()
+        del connections[alias]
+        del connections.databases[alias]
+
+
+@contextmanager
+def capture_blog_reads():
+    # Сессия и пользователь загружаются до представления и читаются с
+    # основной базы; считаем только запросы к таблицам блога.
+    with ExitStack() as stack:
+        contexts = {
+            alias: stack.enter_context(
+                CaptureQueriesContext(connections[alias])
+            )
+            for alias in ["default", *REPLICAS]
+        }
+        reads = {}
+        yield reads
+    for alias, context in contexts.items():
+        reads[alias] = [
+            query["sql"] for query in context.captured_queries
+            if '"blog_' in query["sql"]
+        ]
+
+
+def age_tags(post):
+    # Страница давно не менялась: реплики успели получить все записи.
+    cache.set_many(
+        {TAG_KEY.format(tag): 1 for tag in (f"post:{post.id}", "taxonomy")},
+        None,
+    )
+
+
+def test_router_balances_requests_between_replicas(settings):
+    settings.DATABASE_REPLICAS = REPLICAS
+    router = routers.ReplicaRouter()
+    request = RequestFactory().get("/")
+    chosen = []
+    for _ in range(4):
+        with routers.replica_reads(request):
+            chosen.append(router.db_for_read(None))
+            assert router.db_for_write(None) == "default"
+    assert sorted(chosen) == sorted(REPLICAS * 2)
+    assert router.db_for_read(None) is None, (
+        "Убедитесь, что вне публичных страниц чтение идёт с основной базы."
+    )
+    assert router.allow_migrate("replica_0", "blog") is False
+
+
+@pytest.mark.django_db(transaction=True)
+def test_public_pages_read_from_replica_until_user_writes(
+    user_client, post_with_published_location, replicas
+):
+    post = post_with_published_location
+    url = f"/posts/{post.id}/"
+    # Дата ближайшей отложенной публикации читается с основной базы вне
+    # представления; прогреваем её до снятия копий.
+    release_if_due()
+    replicas()
+    age_tags(post)
+    used = []
+    for _ in REPLICAS:
+        with capture_blog_reads() as reads:
+            response = user_client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        assert not reads["default"], (
+            "Убедитесь, что запросы страницы публикации направляются на"
+            " реплику."
+        )
+        used += [alias for alias in REPLICAS if reads[alias]]
+    assert sorted(used) == REPLICAS, (
+        "Убедитесь, что страницы читаются с реплик по очереди."
+    )
+
+    response = user_client.post(
+        f"/add_comment/{post.id}/", data={"text": "Комментарий"}
+    )
+    assert STICKY_COOKIE in response.cookies, (
+        "Убедитесь, что после записи пользователь закрепляется за основной"
+        " базой."
+    )
+    with capture_blog_reads() as reads:
+        response = user_client.get(url)
+    assert "Комментарий" in response.content.decode("utf-8")
+    assert reads["default"] and not any(
+        reads[alias] for alias in REPLICAS
+    ), "Убедитесь, что сразу после записи страницы читаются с основной базы."
+
+
+@pytest.mark.django_db(transaction=True)
+def test_recently_changed_page_is_read_from_primary(
+    client, mixer, post_with_published_location, replicas
+):
+    post = post_with_published_location
+    url = f"/posts/{post.id}/"
+    release_if_due()
+    replicas()
+    age_tags(post)
+    response = client.get(url)
+    mixer.blend(
+        "blog.Comment", post=post, author=post.author, text="Свежий"
+    )
+    with capture_blog_reads() as reads:
+        response = client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+    assert "Свежий" in response.content.decode("utf-8"), (
+        "Убедитесь, что недавно изменённая страница не собирается с"
+        " отстающей реплики."
+    )
+    assert reads["default"] and not any(
+        reads[alias] for alias in REPLICAS
+    ), (
+        "Убедитесь, что после изменения страницы её читают с основной базы"
+        " REPLICA_STICKY_SECONDS секунд."
+    )
@@ -0,0 +1,79 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+
+@pytest.mark.django_db
+def test_scheduled_post_released_by_command(
+    user_client, future_posts, PostModel
+):
+    post = future_posts[0]
+    assert not post.is_visible
+    response = user_client.get("/")
+    assert post not in response.context["page_obj"]
+
+    PostModel.objects.filter(pk=post.pk).update(
+        pub_date=timezone.now() - timedelta(minutes=1)
+    )
+    call_command("publish_scheduled", stdout=StringIO())
+    post.refresh_from_db()
+    assert post.is_visible, (
+        "Убедитесь, что команда `publish_scheduled` открывает отложенные"
+        " публикации, время которых наступило."
+    )
+    response = user_client.get("/")
+    assert post in response.context["page_obj"], (
+        "Убедитесь, что открытая планировщиком публикация появляется в"
+        " ленте."
+    )
+
+
+@pytest.mark.django_db
+def test_scheduled_post_released_on_request(
+    user_client, future_posts, monkeypatch
+):
+    post = future_posts[0]
+    user_client.get("/")
+    post.refresh_from_db()
+    assert not post.is_visible
+
+    later = (post.pub_date + timedelta(seconds=1)).timestamp()
+    monkeypatch.setattr("blog.scheduling.time.time", lambda: later)
+    monkeypatch.setattr("blog.scheduling.timezone.now", lambda: (
+        post.pub_date + timedelta(seconds=1)
+    ))
+    response = user_client.get("/")
+    post.refresh_from_db()
+    assert post.is_visible, (
+        "Убедитесь, что отложенная публикация открывается при первом"
+        " запросе после наступления её времени."
+    )
+    assert post in response.context["page_obj"]
+
+
+@pytest.mark.django_db
+def test_scheduled_post_released_after_category_is_published(
+    user_client, mixer, user, monkeypatch
+):
+    post = mixer.blend(
+        "blog.Post", author=user, is_published=True,
+        category__is_published=False,
+        pub_date=timezone.now() + timedelta(days=1),
+    )
+    user_client.get("/")
+    category = post.category
+    category.is_published = True
+    category.save()
+
+    later = post.pub_date + timedelta(seconds=1)
+    monkeypatch.setattr("blog.scheduling.time.time", later.timestamp)
+    monkeypatch.setattr("blog.scheduling.timezone.now", lambda: later)
+    user_client.get("/")
+    post.refresh_from_db()
+    assert post.is_visible, (
+        "Убедитесь, что публикация открывается по расписанию, если её"
+        " категорию опубликовали после первого запроса."
+    )
@@ -0,0 +1,84 @@
+import threading
+from http import HTTPStatus
+
+import pytest
+
+from blog import writer
+
+
+@pytest.mark.django_db(transaction=True)
+def test_comment_is_written_by_writer_thread(
+    user_client, post_with_published_location, CommentModel, settings,
+    monkeypatch
+):
+    settings.DB_WRITE_SERIALIZED = True
+    threads = []
+    save = CommentModel.save
+
+    def remember_thread(self, *args, **kwargs):
+        threads.append(threading.current_thread().name)
+        return save(self, *args, **kwargs)
+
+    monkeypatch.setattr(CommentModel, "save", remember_thread)
+    post = post_with_published_location
+    response = user_client.post(
+        f"/add_comment/{post.id}/", data={"text": "Комментарий"}
+    )
+    assert response.status_code == HTTPStatus.FOUND
+    assert CommentModel.objects.filter(post=post).count() == 1
+    assert threads == ["db-writer"], (
+        "Убедитесь, что в режиме DB_WRITE_SERIALIZED комментарий"
+        " записывается потоком-писателем."
+    )
+
+
+@pytest.mark.django_db
+def test_full_write_queue_returns_503(
+    user_client, post_with_published_location, settings, monkeypatch
+):
+    settings.DB_WRITE_SERIALIZED = True
+
+    def reject(*args, **kwargs):
+        raise writer.WriteUnavailable()
+
+    monkeypatch.setattr(writer.db_writer, "submit", reject)
+    response = user_client.post(
+        f"/add_comment/{post_with_published_location.id}/",
+        data={"text": "Комментарий"},
+    )
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE, (
+        "Убедитесь, что при переполненной очереди записи сервер отвечает"
+        " статусом 503."
+    )
+    assert response.has_header("Retry-After")
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("action, data", [
+    ("edit", {"title": "Заголовок", "text": "Текст"}),
+    ("edit_comment/{comment}", {"text": "Исправлено"}),
+    ("delete_comment/{comment}", {}),
+])
+def test_edits_go_through_write_queue(
+    mixer, user, user_client, post_with_published_location, settings,
+    monkeypatch, action, data
+):
+    settings.DB_WRITE_SERIALIZED = True
+    post = post_with_published_location
+    comment = mixer.blend("blog.Comment", post=post, author=user)
+
+    def reject(*args, **kwargs):
+        raise writer.WriteUnavailable()
+
+    monkeypatch.setattr(writer.db_writer, "submit", reject)
+    url = f"/posts/{post.id}/{action.format(comment=comment.id)}/"
+    data = {
+        **data,
+        "pub_date": post.pub_date.strftime("%Y-%m-%d %H:%M"),
+        "category": post.category_id,
+    }
+    response = user_client.post(url, data=data)
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE, (
+        f"Убедитесь, что запрос `{url}` в режиме DB_WRITE_SERIALIZED"
+        " записывает данные через поток-писатель."
+    )
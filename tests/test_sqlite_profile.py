@@ -0,0 +1,18 @@
+import pytest
+from django.db import connection
+
+from blog.signals import apply_sqlite_pragmas
+
+
+@pytest.mark.django_db
+def test_production_pragmas_are_applied_to_new_connections(settings):
+    settings.SQLITE_PRAGMAS = {"cache_size": -12345, "busy_timeout": 1234}
+    apply_sqlite_pragmas(sender=type(connection), connection=connection)
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA cache_size")
+        assert cursor.fetchone()[0] == -12345, (
+            "Убедитесь, что настройки SQLITE_PRAGMAS применяются к новому"
+            " соединению с базой данных."
+        )
+        cursor.execute("PRAGMA busy_timeout")
+        assert cursor.fetchone()[0] == 1234